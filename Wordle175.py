@@ -1,41 +1,339 @@
 # Author: Matthew Neufeld
 # Program Description: Creates the SrabbleDict class from data in scrabble5.txt
-# Collaborators/References: https://www.kite.com/python/answers/how-to-check-if-a-string-contains-certain-characters-in-python
+# Collaborators/References: https://www.kite.com/python/answers/how-to-check-if-a-string-contains-certain-characters-in-python,
+# https://docs.python.org/3/library/array.html, https://docs.python.org/3/library/mmap.html,
+# https://docs.python.org/3/library/multiprocessing.shared_memory.html
+
+
+import hashlib
+import mmap
+import os
+import struct
+import sys
+import multiprocessing
+import threading
+from multiprocessing import shared_memory
+from array import array
+from bisect import bisect_left
+from collections.abc import Sequence
+from itertools import combinations, islice
+
+
+# every letter of a word is packed into 5 bits (A = 1 ... Z = 26) so a word fits in one unsigned 64-bit int
+LETTER_BITS = 5
+MAX_WORD_SIZE = 64 // LETTER_BITS
+
+# PAIRS[code] is the text of a 10-bit code holding two letters - a letter code of 0 means "no letter", which lets the --
+# first pair of a word with an odd number of letters hold a single letter
+PAIRS = []
+for pair_code in range(1 << (2 * LETTER_BITS)):
+    pair = ''
+    for letter_code in (pair_code >> LETTER_BITS, pair_code & 31):
+        if 1 <= letter_code <= 26:
+            pair += chr(64 + letter_code)
+    PAIRS.append(pair)
+
+LETTERS = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+
+# a bytes.translate table that turns every character into '0' - build_index swaps in a '1' for one letter
+ZERO_TABLE = b'0' * 256
+
+# get_masked_words_batch answers this many templates at a time
+BATCH_CHUNK_SIZE = 4096
+
+# a template shape is answered with one pass over every word once it has at least 1 / SHARED_PASS_RATIO templates --
+# for every word in the dictionary - fewer templates are answered faster through the positional index
+SHARED_PASS_RATIO = 64
+
+# the dictionary attached by a worker of SharedDictionary.get_pool - set once in each worker by init_shared_worker
+shared_worker = {}
+
+# get_suggestions gives at most this many words
+SUGGESTION_LIMIT = 5
+
+# a snapshot file starts with: magic, word size, number of words, source size, source mtime_ns, source sha256
+SNAPSHOT_MAGIC = b'SCRBSNP1'
+SNAPSHOT_HEADER = '<8sIQQq32s'
+
+
+def pack_word(word):
+    """Function packs an upper case word into an int, 5 bits per letter with the first letter in the highest bits - so
+    packed words sort in the same order as the words themselves
+
+    Parameters: word
+    returns: code (None if the word has a character that is not A-Z)
+    """
+
+    code = 0
+    for letter in word:
+        letter_code = ord(letter) - 64
+        if not 1 <= letter_code <= 26:
+            return None
+        code = (code << LETTER_BITS) | letter_code
+
+    return code
+
+
+class WordView(Sequence):
+
+    def __init__(self, packed, size):
+        """Initializes a read-only view of the packed words - words are only unpacked when they are used
+        Parameters: self, packed, size
+        returns: N/A
+        """
+
+        self.packed = packed
+        # each shift reads two letters (10 bits) of a packed word, starting from the highest bits
+        self.shifts = range(((size + 1) // 2 - 1) * 2 * LETTER_BITS, -1, -2 * LETTER_BITS)
+
+    def unpack_word(self, code):
+        """Function turns a packed word back into its text
+        Parameters: self, code
+        returns: word
+        """
+
+        return ''.join([PAIRS[(code >> shift) & 1023] for shift in self.shifts])
+
+    def __len__(self):
+        return len(self.packed)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.unpack_word(code) for code in self.packed[index]]
+        return self.unpack_word(self.packed[index])
+
+    def __iter__(self):
+        for code in self.packed:
+            yield self.unpack_word(code)
 
 
 class ScrabbleDict:
 
-    def __init__(self, size, filename):
-        """Initializes each parameter and creates the dictionary
-        Parameters: self, size, filename
+    def __init__(self, size, filename, snapshot=True, source=None, buffer=None):
+        """Initializes each parameter and creates the dictionary. Every word is packed into an int and kept in an array
+        in the order it was read, instead of storing each word as both a key and a value
+
+        Parameters: self, size, filename, snapshot (False never reads or writes a snapshot file), source (a WordSource
+        for filename that has already bucketed its words by length - see get_dictionary), buffer (a buffer holding a
+        snapshot to load instead of any file - see attach_dictionary)
         returns: N/A
         """
 
+        if size > MAX_WORD_SIZE:
+            raise ValueError(f'words longer than {MAX_WORD_SIZE} letters cannot be packed')
+
         self.filename = filename
-        self.dict1 = {}
         self.size = size
+        self.source = source
+
+        if buffer is not None:
+            if not self.load_buffer(buffer):
+                raise ValueError(f'the buffer does not hold a dictionary of {size} letter words')
+            return
 
-        # creating the dictionary with each line from file as a key and value
+        # the snapshot next to the source file skips parsing the text entirely when the source has not changed - the --
+        # source's stamp is worked out once and used both to check the snapshot and to save a new one
+        if snapshot:
+            stamp = self.get_source_stamp()
+            if self.load_snapshot(stamp):
+                return
+
+        self.read_words()
+        self.build_storage()
+
+        # building the positional letter index once so that get_masked_words does not scan the whole dictionary
+        self.build_index()
+
+        if snapshot:
+            self.save_snapshot(stamp)
+
+    def read_words(self):
+        """Function reads every word of the proper size from the source file into self.packed
+        Parameters: self
+        returns: None
+        """
+
+        # a shared source has already read the file once for every word size
+        if self.source is not None:
+            self.packed = self.source.get_packed(self.size)
+            return
+
+        self.packed = array('Q')
+
+        # creating the dictionary with each line from file - seen is only used to skip repeated words while loading
+        seen = set()
         file = open(self.filename, 'r')
         for line in file:
             new_line = line.strip('\n')
             # validating that the length of each word is the proper size
             if len(new_line) == self.size:
-                self.dict1[new_line.upper()] = new_line.upper()
+                code = pack_word(new_line.upper())
+                if code is not None and code not in seen:
+                    seen.add(code)
+                    self.packed.append(code)
         file.close()
 
-    def create_key_list(self):
-        """Function creates a list of all keys in the word dictionary
+    def build_storage(self):
+        """Function sets up the views over self.packed: word_list (file order), sorted_packed (used by check and the
+        prefix queries) and sorted_words (the words of sorted_packed)
         Parameters: self
-        returns: key_list
+        returns: None
         """
 
-        # every key in self.dict1 will be added to key_list
-        key_list = []
-        for key in self.dict1:
-            key_list.append(key)
+        self.word_list = WordView(self.packed, self.size)
 
-        return key_list
+        # check() does a binary search - scrabble5.txt is already sorted, so a second array is only made when needed
+        # sorted_order[i] is the index in word_list of sorted_packed[i] - only needed when the file was not sorted
+        self.sorted_packed = self.packed
+        self.sorted_order = None
+        for index in range(1, len(self.packed)):
+            if self.packed[index - 1] > self.packed[index]:
+                self.sorted_order = array('L', sorted(range(len(self.packed)), key=self.packed.__getitem__))
+                self.sorted_packed = array('Q', [self.packed[index] for index in self.sorted_order])
+                break
+        self.sorted_words = WordView(self.sorted_packed, self.size)
+
+    def get_snapshot_path(self):
+        """Function gets the path of the snapshot file for this source file and word size
+        Parameters: self
+        returns: path
+        """
+
+        return f'{self.filename}.{self.size}.snapshot'
+
+    def get_source_stamp(self):
+        """Function gets what a snapshot has to match to be used - see get_file_stamp. A shared source works its stamp
+        out once for every word size
+
+        Parameters: self
+        returns: (size, mtime_ns, digest)
+        """
+
+        if self.source is not None:
+            return self.source.get_stamp()
+        return get_file_stamp(self.filename)
+
+    def get_snapshot_parts(self, stamp):
+        """Function gets the contents of a snapshot: a header followed by the packed words and one bitset of
+        (len(word_list) + 7) // 8 bytes for every (position, letter)
+
+        Parameters: self, stamp (the (size, mtime_ns, digest) of the source file the snapshot is for)
+        returns: a list of bytes objects
+        """
+
+        source_size, mtime_ns, digest = stamp
+        parts = [struct.pack(SNAPSHOT_HEADER, SNAPSHOT_MAGIC, self.size, len(self.packed), source_size, mtime_ns,
+                             digest)]
+
+        packed = array('Q', self.packed)
+        if sys.byteorder != 'little':
+            packed.byteswap()
+        parts.append(packed.tobytes())
+
+        bitset_size = (len(self.packed) + 7) // 8
+        for letter_bits in self.position_index:
+            for letter in LETTERS:
+                parts.append(letter_bits.get(letter, 0).to_bytes(bitset_size, 'little'))
+
+        return parts
+
+    def save_snapshot(self, stamp):
+        """Function saves the packed words and the positional letter index to the snapshot file
+        Parameters: self, stamp (the source file's (size, mtime_ns, digest) - see get_source_stamp)
+        returns: None
+        """
+
+        path = self.get_snapshot_path()
+        # writing to a temporary file first means another process never loads a half-written snapshot
+        temp_path = f'{path}.{os.getpid()}.tmp'
+        try:
+            file = open(temp_path, 'wb')
+            for part in self.get_snapshot_parts(stamp):
+                file.write(part)
+            file.close()
+            os.replace(temp_path, path)
+        except OSError:
+            # a read-only directory only means the next launch parses the text again
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def load_snapshot(self, stamp):
+        """Function loads the packed words and positional letter index from the snapshot file through mmap. The
+        snapshot is only used if the source file's size, modification time and content hash all still match
+
+        Parameters: self, stamp (the source file's (size, mtime_ns, digest) - see get_source_stamp)
+        returns: True if the snapshot was loaded, False otherwise
+        """
+
+        try:
+            file = open(self.get_snapshot_path(), 'rb')
+        except OSError:
+            return False
+        try:
+            buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # an empty file cannot be mapped
+            file.close()
+            return False
+        file.close()
+
+        return self.load_buffer(buffer, stamp)
+
+    def load_buffer(self, buffer, stamp=None):
+        """Function loads the packed words and positional letter index from a buffer holding a snapshot (a mapped file
+        or a shared memory block). The packed words are used straight out of the buffer without being copied
+
+        Parameters: self, buffer, stamp (the source file's (size, mtime_ns, digest) the snapshot must match - None
+        skips the check)
+        returns: True if the buffer was loaded, False otherwise
+        """
+
+        header_size = struct.calcsize(SNAPSHOT_HEADER)
+        if len(buffer) < header_size:
+            return False
+        magic, size, count, source_size, mtime_ns, digest = struct.unpack_from(SNAPSHOT_HEADER, buffer)
+        if magic != SNAPSHOT_MAGIC or size != self.size:
+            return False
+        if stamp is not None and (source_size, mtime_ns, digest) != stamp:
+            return False
+
+        bitset_size = (count + 7) // 8
+        if len(buffer) < header_size + count * 8 + self.size * len(LETTERS) * bitset_size:
+            return False
+
+        view = memoryview(buffer).toreadonly()
+        if sys.byteorder == 'little':
+            self.packed = view[header_size:header_size + count * 8].cast('Q')
+        else:
+            # the snapshot stores the packed words little-endian
+            self.packed = array('Q', view[header_size:header_size + count * 8].tobytes())
+            self.packed.byteswap()
+        self.build_storage()
+
+        self.all_bits = (1 << count) - 1
+        self.position_index = []
+        offset = header_size + count * 8
+        for position in range(self.size):
+            letter_bits = {}
+            for letter in LETTERS:
+                bits = int.from_bytes(view[offset:offset + bitset_size], 'little')
+                offset += bitset_size
+                if bits:
+                    letter_bits[letter] = bits
+            self.position_index.append(letter_bits)
+        self.count_index = {}
+        self.signatures = None
+        self.position_counts = None
+
+        return True
+
+    def create_key_list(self):
+        """Function gets all words in the word dictionary
+        Parameters: self
+        returns: key_list (a read-only view of the words, in the order they were read - nothing is copied)
+        """
+
+        return self.word_list
 
     def check(self, word):
         """Function determines whether a word is in the word dictionary or not
@@ -43,19 +341,35 @@ class ScrabbleDict:
         returns: True or False
         """
 
-        # function will return True if the word is self.dict1 - False otherwise
-        if word in self.dict1:
-            return True
-        else:
-            return False
+        # function will return True if the word has an index in the dictionary - False otherwise
+        return self.get_index(word) is not None
+
+    def get_index(self, word):
+        """Function finds the index of a word in self.word_list with a binary search over self.sorted_packed
+        Parameters: self, word
+        returns: index (None if the word is not in the word dictionary)
+        """
+
+        if len(word) != self.size:
+            return None
+        code = pack_word(word)
+        if code is None:
+            return None
+        index = bisect_left(self.sorted_packed, code)
+        if index == len(self.sorted_packed) or self.sorted_packed[index] != code:
+            return None
+
+        if self.sorted_order is None:
+            return index
+        return self.sorted_order[index]
 
     def get_size(self):
-        """Function gets the number of keys in the word dictionary
+        """Function gets the number of words in the word dictionary
         Parameters: self
-        returns: len(self.dict1.keys())
+        returns: len(self.packed)
         """
 
-        return len(self.dict1.keys())
+        return len(self.packed)
 
     def get_words(self, letter):
         """ Function returns a list of all keys in a dictionary that begin with a given letter
@@ -63,25 +377,217 @@ class ScrabbleDict:
         returns: sorted_list
         """
 
-        word_list = []
-        for key in self.dict1:
-            if key[0] == letter:  # key[0] evaluates to the first letter of the key
-                word_list.append(key)
-
-        # ensures that the contents of the list is sorted
         # method description from assignment: "returns a sorted list of words in the dictionary starting with the character letter"
-        sorted_list = sorted(word_list)
+        # a single letter is just a prefix of length 1 - the words come out of the sorted index already in order
+        sorted_list = self.get_words_with_prefix(letter)
+        return sorted_list
+
+    def iter_words(self, letter, offset=0, limit=None):
+        """Function goes through the words starting with a given letter in sorted order, one page at a time
+        Parameters: self, letter, offset (number of words to skip), limit (most words to give, None for all)
+        returns: a generator of words
+        """
+
+        return self.iter_words_with_prefix(letter, offset, limit)
+
+    def count_words(self, letter):
+        """Function counts the words starting with a given letter without unpacking any of them
+        Parameters: self, letter
+        returns: count
+        """
+
+        return self.count_words_with_prefix(letter)
+
+    def get_prefix_range(self, prefix):
+        """Function finds where the words starting with prefix are in self.sorted_packed. Because the first letter is
+        packed into the highest bits, those words are exactly the packed ints from prefix followed by all 0 bits up to
+        (but not including) the next prefix followed by all 0 bits
+
+        Parameters: self, prefix
+        returns: (start, stop) - the words are self.sorted_words[start:stop]
+        """
+
+        if len(prefix) > self.size:
+            return 0, 0
+        code = pack_word(prefix)
+        if code is None:
+            return 0, 0
+
+        shift = LETTER_BITS * (self.size - len(prefix))
+        start = bisect_left(self.sorted_packed, code << shift)
+        stop = bisect_left(self.sorted_packed, (code + 1) << shift, start)
+
+        return start, stop
+
+    def get_words_with_prefix(self, prefix):
+        """Function returns a sorted list of all words in the dictionary that begin with prefix
+        Parameters: self, prefix
+        returns: sorted_list
+        """
+
+        start, stop = self.get_prefix_range(prefix)
+        sorted_list = self.sorted_words[start:stop]
         return sorted_list
 
+    def iter_words_with_prefix(self, prefix, offset=0, limit=None):
+        """Function goes through the words that begin with prefix in sorted order, one page at a time - words are only
+        unpacked as they are used
+
+        Parameters: self, prefix, offset (number of matching words to skip), limit (most words to give, None for all)
+        returns: a generator of words
+        """
+
+        start, stop = self.get_prefix_range(prefix)
+        start = min(start + offset, stop)
+        if limit is not None:
+            stop = min(stop, start + limit)
+
+        for index in range(start, stop):
+            yield self.sorted_words[index]
+
+    def count_words_with_prefix(self, prefix):
+        """Function counts the words that begin with prefix - two binary searches and no words unpacked
+        Parameters: self, prefix
+        returns: count
+        """
+
+        start, stop = self.get_prefix_range(prefix)
+        return stop - start
+
     def get_word_size(self):
         """Function gets the length of the words in the word dictionary
         Parameters: self
-        returns: len(list(self.dict1)[0])
+        returns: self.size
         """
 
-        # because all words in the dictionary are the same length, any index can be used. I chose index = 0
-        # need to use list() because dictionaries cannot be indexed
-        return len(list(self.dict1)[0])
+        # every word kept in the dictionary has exactly self.size letters
+        return self.size
+
+    def build_index(self):
+        """Function builds the positional letter index used by get_masked_words. Every word is given an index in
+        self.word_list and, for each position, every letter maps to a bitset (an int) of the words with that letter in
+        that position
+
+        Parameters: self
+        returns: None
+        """
+
+        # all_bits has a bit set for every word in the dictionary - a template made only of wildcards matches all of them
+        self.all_bits = (1 << len(self.word_list)) - 1
+
+        # position_index[position][letter] is a bitset - bit i is set if word_list[i] has letter at position. Setting --
+        # one bit at a time would copy the whole bitset for every letter of every word, so each position's letters --
+        # are sliced out of the joined words instead, turned into a string of '0' and '1' for each letter and parsed
+        text = ''.join(self.word_list).encode('ascii')
+        self.position_index = []
+        for position in range(self.size):
+            # reversed so that word 0 ends up in the lowest bit
+            column = text[position::self.size][::-1]
+            letter_bits = {}
+            for code in set(column):
+                table = ZERO_TABLE[:code] + b'1' + ZERO_TABLE[code + 1:]
+                letter_bits[chr(code)] = int(column.translate(table), 2)
+            self.position_index.append(letter_bits)
+
+        # count_index[letter] is filled in by get_count_bits when a letter is first used, signatures by --
+        # get_signatures and position_counts by get_position_counts
+        self.count_index = {}
+        self.signatures = None
+        self.position_counts = None
+
+    def get_count_bits(self, letter, count):
+        """Function gets the bitset of the words that have at least count copies of letter. The bitsets for a letter are
+        worked out from the positional index the first time that letter is asked for
+
+        Parameters: self, letter, count
+        returns: bits
+        """
+
+        if count <= 0:
+            return self.all_bits
+        if count > self.size:
+            return 0
+
+        if letter not in self.count_index:
+            # at_least[m] is the bitset of words with at least m copies of letter - going through the positions one --
+            # at a time, a word reaches m copies if it had m - 1 copies and has letter at this position
+            at_least = [self.all_bits] + [0] * self.size
+            for letter_bits in self.position_index:
+                bits = letter_bits.get(letter, 0)
+                for m in range(self.size, 0, -1):
+                    at_least[m] |= at_least[m - 1] & bits
+            self.count_index[letter] = at_least
+
+        return self.count_index[letter][count]
+
+    def bits_to_words(self, bits):
+        """Function turns a bitset from the positional index back into the list of words it represents
+        Parameters: self, bits
+        returns: word_list
+        """
+
+        # the binary string is reversed so that the index of each '1' is the index of a word in self.word_list - --
+        # str.find() does the scanning instead of testing every bit one at a time
+        binary = format(bits, 'b')[::-1]
+        word_list = []
+        index = binary.find('1')
+        while index != -1:
+            word_list.append(self.word_list[index])
+            index = binary.find('1', index + 1)
+
+        return word_list
+
+    def iter_bits(self, bits, offset=0, limit=None):
+        """Function goes through the words of a bitset in self.word_list order, one page at a time. The bitset is
+        read 64 words at a time, so skipping offset words only needs a bit count for each block before the page
+
+        Parameters: self, bits, offset (number of words to skip), limit (most words to give, None for all)
+        returns: a generator of words
+        """
+
+        if limit is not None and limit <= 0:
+            return
+        data = bits.to_bytes((bits.bit_length() + 7) // 8, 'little')
+        for start in range(0, len(data), 8):
+            block = int.from_bytes(data[start:start + 8], 'little')
+            if offset:
+                count = block.bit_count()
+                if offset >= count:
+                    offset -= count
+                    continue
+            while block:
+                lowest = block & -block
+                block ^= lowest
+                if offset:
+                    offset -= 1
+                    continue
+                yield self.word_list[start * 8 + lowest.bit_length() - 1]
+                if limit is not None:
+                    limit -= 1
+                    if not limit:
+                        return
+
+    def get_masked_bits(self, template):
+        """Function gets the bitset of the words that match a template with wildcard(s) ('*')
+        Parameters: self, template
+        returns: bits
+        """
+
+        # a template of the wrong length can never match a word in the dictionary
+        if len(template) != self.size:
+            return 0
+
+        # starting with every word, each letter in the template removes the words that do not have that letter in the --
+        # same position - wildcards leave the bitset alone
+        bits = self.all_bits
+        for position, letter in enumerate(template):
+            if letter != '*':
+                bits &= self.position_index[position].get(letter, 0)
+                # no need to keep going once there are no words left
+                if not bits:
+                    return 0
+
+        return bits
 
     def get_masked_words(self, template):
         """Function takes a template with wildcard(s) ('*') and returns a list of words that the target_word could be
@@ -91,70 +597,642 @@ class ScrabbleDict:
         returns final_list
         """
 
-        # following chunk of code generates template_list: a list of all characters from the template and index_list: --
-        # a list of the indexes of wildcards
-        template_list = []
-        index_list = []
-        for item in range(len(template)):
-            # adding every template item to template_list
-            template_list.append(template[item])
-            # adding the index of every '*' to index_list
-            if template[item] == '*':
-                index_list.append(item)
-
-        # following chunk of code creates a list of lists of letters from all words in the word dictionary
-        # making a key_list from the word dictionary
-        key_list = self.create_key_list()
-        list_of_list_letters = []
-        for key in key_list:
-            letter_list = []
-            for letter in key:
-                # adding each letter in the word to letter_list
-                letter_list.append(letter)
-            # taking each resulting letter_list and add it to list_of_list_letters
-            list_of_list_letters.append(letter_list)
-
-        # this chunk of code replaces each letter in each list in list_of_list_letters with a wildcard based on --
-        # index_list - result is a list containing lists with wildcards in the same index(es) as template
-        for i in index_list:
-            for a_list in range(len(list_of_list_letters)):
-                list_of_list_letters[a_list][i] = '*'
-
-        # this chunk of code compares each list in list_of_list_letters with template list - if they are equal, then --
-        # original unmasked version of that word is added to final_list and is returned
-        final_list = []
-        for index in range(len(list_of_list_letters)):
-            # comparing 2 lists with wildcards
-            if list_of_list_letters[index] == template_list:
-                # adding unmasked version of the word to final_list if equal
-                final_list.append(key_list[index])
+        final_list = self.bits_to_words(self.get_masked_bits(template))
 
         return final_list
 
-    def get_constrained_words(self, template, letters):
+    def iter_masked_words(self, template, offset=0, limit=None):
+        """Function goes through the words matching a template with wildcard(s) ('*') one page at a time - only the
+        words on the page are unpacked
+
+        Parameters: self, template, offset (number of matching words to skip), limit (most words to give, None for all)
+        returns: a generator of words
+        """
+
+        return self.iter_bits(self.get_masked_bits(template), offset, limit)
+
+    def count_masked_words(self, template):
+        """Function counts the words matching a template with wildcard(s) ('*') straight from the positional index
+        Parameters: self, template
+        returns: count
+        """
+
+        return self.get_masked_bits(template).bit_count()
+
+    def get_template_key(self, template):
+        """Function packs a template the same way as the words - the shape has 5 set bits for every letter that is not
+        a wildcard, so a word matches the template if (packed word & shape) == key
+
+        Parameters: self, template
+        returns: (shape, key) - (None, None) if no word can match the template
+        """
+
+        if len(template) != self.size:
+            return None, None
+
+        shape = 0
+        key = 0
+        for letter in template:
+            shape <<= LETTER_BITS
+            key <<= LETTER_BITS
+            if letter != '*':
+                letter_code = ord(letter) - 64
+                if not 1 <= letter_code <= 26:
+                    return None, None
+                shape |= 31
+                key |= letter_code
+
+        return shape, key
+
+    def answer_templates(self, templates, letters, counts_only):
+        """Function answers a chunk of template queries. Repeated templates are only answered once, and templates are
+        grouped by shape: a shape with many templates is answered by one shared pass over the packed words, the rest
+        through the positional index
+
+        Parameters: self, templates, letters (a list with the letters each template's words must contain, or None),
+        counts_only
+        returns: results (in the same order as templates)
+        """
+
+        if letters is not None and len(letters) != len(templates):
+            raise ValueError('letters must have one entry for every template')
+
+        results = [None] * len(templates)
+        # groups[shape][key] is the list of template numbers with that shape and key
+        groups = {}
+        for number in range(len(templates)):
+            shape, key = self.get_template_key(templates[number])
+            if shape is None:
+                results[number] = 0 if counts_only else []
+            else:
+                groups.setdefault(shape, {}).setdefault(key, []).append(number)
+
+        for shape in groups:
+            keys = groups[shape]
+            query_count = 0
+            for key in keys:
+                query_count += len(keys[key])
+
+            if query_count * SHARED_PASS_RATIO >= len(self.packed):
+                # one pass over the packed words collects the matches of every template of this shape
+                matches = {key: [] for key in keys}
+                for index, code in enumerate(self.packed):
+                    found = matches.get(code & shape)
+                    if found is not None:
+                        found.append(index)
+                for key in keys:
+                    for number in keys[key]:
+                        results[number] = self.finish_indexes(matches[key], letters and letters[number], counts_only)
+            else:
+                for key in keys:
+                    bits = self.get_masked_bits(templates[keys[key][0]])
+                    for number in keys[key]:
+                        results[number] = self.finish_bits(bits, letters and letters[number], counts_only)
+
+        return results
+
+    def finish_indexes(self, indexes, letters, counts_only):
+        """Function applies the letter constraint to a list of word indexes and turns it into a query result
+        Parameters: self, indexes, letters, counts_only
+        returns: the words (or the number of words)
+        """
+
+        if letters:
+            if not set(letters) <= set(LETTERS):
+                indexes = []
+            else:
+                required = get_signature(letters)
+                signatures = self.get_signatures()
+                indexes = [index for index in indexes if signatures[index] & required == required]
+
+        if counts_only:
+            return len(indexes)
+        return [self.word_list[index] for index in indexes]
+
+    def finish_bits(self, bits, letters, counts_only):
+        """Function applies the letter constraint to a bitset and turns it into a query result
+        Parameters: self, bits, letters, counts_only
+        returns: the words (or the number of words)
+        """
+
+        if letters:
+            bits = self.get_letter_bits(letters, bits=bits)
+
+        if counts_only:
+            return bits.bit_count()
+        return self.bits_to_words(bits)
+
+    def get_masked_words_batch(self, templates, letters=None, counts_only=False, processes=1):
+        """Function answers many template queries at once - see answer_templates. Large batches can be split across a
+        pool of worker processes, which all attach to one copy of the dictionary in shared memory
+
+        Parameters: self, templates, letters (None, or the letters each template's words must contain - one entry for
+        every template, in the same order), counts_only (True gives the number of matching words instead of the words),
+        processes
+        returns: a generator of results, in the same order as templates
+        """
+
+        templates = iter(templates)
+        if letters is not None:
+            letters = iter(letters)
+
+        chunks = self.get_template_chunks(templates, letters)
+        if processes == 1:
+            for chunk_templates, chunk_letters in chunks:
+                yield from self.answer_templates(chunk_templates, chunk_letters, counts_only)
+            return
+
+        with SharedDictionary(self) as shared, shared.get_pool(processes) as pool:
+            # the chunks are handed to the pool as they are cut, so a huge batch is never held in memory at once
+            for results in pool.imap(answer_batch_chunk, ((chunk, counts_only) for chunk in chunks)):
+                yield from results
+
+    def get_template_chunks(self, templates, letters):
+        """Function splits the template queries into chunks of BATCH_CHUNK_SIZE
+        Parameters: self, templates (an iterator), letters (an iterator, or None)
+        returns: a generator of (templates, letters) tuples
+        """
+
+        while True:
+            chunk_templates = list(islice(templates, BATCH_CHUNK_SIZE))
+            chunk_letters = None
+            if letters is not None:
+                # one more entry is taken once the templates run out, to make sure there are no letters left over
+                chunk_letters = list(islice(letters, max(len(chunk_templates), 1)))
+                if len(chunk_letters) != len(chunk_templates):
+                    raise ValueError('letters must have one entry for every template')
+            if not chunk_templates:
+                return
+            yield chunk_templates, chunk_letters
+
+    def get_position_counts(self, bits=None):
+        """Function counts how many words have each letter in each position straight from the positional index - one
+        AND and bit count for every (position, letter), so no word is unpacked. The counts for the whole dictionary are
+        worked out on the first call and kept
+
+        Parameters: self, bits (only the words in this bitset are counted, None for every word)
+        returns: position_counts (a dictionary of letter: count for each position - letters with no words are left out)
+        """
+
+        if bits is None:
+            if self.position_counts is None:
+                self.position_counts = self.get_position_counts(self.all_bits)
+            return self.position_counts
+
+        position_counts = []
+        for letter_bits in self.position_index:
+            counts = {}
+            for letter in letter_bits:
+                count = (letter_bits[letter] & bits).bit_count()
+                if count:
+                    counts[letter] = count
+            position_counts.append(counts)
+
+        return position_counts
+
+    def get_signatures(self):
+        """Function gets the letter signature of every word in self.word_list, working them out on the first call. The
+        lowest 26 bits of a signature are the letters in the word (A = bit 0), the next 26 bits are the letters that
+        appear at least twice, and so on - so "contains these letters" is a single superset test
+
+        Parameters: self
+        returns: signatures
+        """
+
+        if self.signatures is None:
+            self.signatures = [get_signature(word) for word in self.word_list]
+
+        return self.signatures
+
+    def get_letter_bits(self, letters, excluded='', bits=None):
+        """Function gets the bitset of the words that contain every letter in letters (a repeated letter must appear
+        at least that many times) and none of the letters in excluded, by intersecting the letter count bitsets
+
+        Parameters: self, letters, excluded, bits (only words in this bitset are kept, None for every word)
+        returns: bits
+        """
+
+        if bits is None:
+            bits = self.all_bits
+
+        letter_count = {}
+        for letter in letters:
+            letter_count[letter] = letter_count.get(letter, 0) + 1
+        for letter in letter_count:
+            bits &= self.get_count_bits(letter, letter_count[letter])
+
+        for letter in excluded:
+            # removing the words with at least one copy of letter
+            bits ^= bits & self.get_count_bits(letter, 1)
+
+        return bits
+
+    def get_words_with_letters(self, letters, excluded=''):
+        """Function returns a list of all words in the dictionary that contain every letter in letters and none of the
+        letters in excluded
+
+        Parameters: self, letters, excluded
+        returns: word_list
+        """
+
+        return self.bits_to_words(self.get_letter_bits(letters, excluded))
+
+    def get_constrained_words(self, template, letters, excluded=''):
         """Function works similarly to get_unmasked_words except it returns a list of all words that could be the
-        target word given indicated letters - extended from get_unmasked_words
+        target word given indicated letters - extended from get_unmasked_words. A word must contain every letter in
+        letters (a letter given twice must appear at least twice) and none of the letters in excluded
 
-        Parameters: self, template, letters
+        Parameters: self, template, letters, excluded
         returns constrained_words
         """
 
+        # only capital letters can ever be in a word
+        if not set(letters) <= set(LETTERS):
+            return []
+        excluded = set(excluded) & set(LETTERS)
+
+        # required and forbidden are signatures - a word matches if its signature has every bit of required and no --
+        # bit of forbidden
+        required = get_signature(letters)
+        forbidden = get_signature(excluded)
+        signatures = self.get_signatures()
+
         constrained_words = []
-        bool_lists = []
         for word in template:
-            # letter_match_list is a list of bool values - if the letter in the word in the template is one of the ch --
-            # in letters, then that index is True - otherwise False.
-            letter_match_list = [letter in letters for letter in word]
-            bool_lists.append(letter_match_list)
-
-        # this chunk counts up the number of times True occurs in each list - if the count of True is equal to length --
-        # of the letters, then the same index of the template is added to constrained words
-        for index in range(len(bool_lists)):
-            if bool_lists[index].count(True) == len(letters):
-                constrained_words.append(template[index])
+            index = self.get_index(word)
+            if index is not None:
+                signature = signatures[index]
+                if signature & required == required and not signature & forbidden:
+                    constrained_words.append(word)
 
         return constrained_words
 
+    def get_constrained_bits(self, template, letters, excluded=''):
+        """Function gets the bitset of the words that match a template with wildcard(s) ('*'), contain every letter in
+        letters and none of the letters in excluded - the same words get_constrained_words gives for the words of the
+        template, without making a list of either
+
+        Parameters: self, template, letters, excluded
+        returns: bits
+        """
+
+        # only capital letters can ever be in a word
+        if not set(letters) <= set(LETTERS):
+            return 0
+        bits = self.get_masked_bits(template)
+        if not bits:
+            return 0
+
+        return self.get_letter_bits(letters, set(excluded) & set(LETTERS), bits)
+
+    def iter_constrained_words(self, template, letters, excluded='', offset=0, limit=None):
+        """Function goes through the words given by get_constrained_bits one page at a time
+        Parameters: self, template, letters, excluded, offset (number of matching words to skip), limit (most words
+        to give, None for all)
+        returns: a generator of words
+        """
+
+        return self.iter_bits(self.get_constrained_bits(template, letters, excluded), offset, limit)
+
+    def count_constrained_words(self, template, letters, excluded=''):
+        """Function counts the words given by get_constrained_bits straight from the indexes
+        Parameters: self, template, letters, excluded
+        returns: count
+        """
+
+        return self.get_constrained_bits(template, letters, excluded).bit_count()
+
+    def get_neighbor_bits(self, word, distance):
+        """Function finds the words that differ from word in at most distance positions (Hamming distance). Every way
+        of leaving distance positions free is one AND of the positional index over the other positions, so no word is
+        ever compared with word
+
+        Parameters: self, word, distance
+        returns: bits
+        """
+
+        # a character that is not in the index matches no word, so that position must be one of the free ones
+        letter_bits = [self.position_index[position].get(letter, 0) for position, letter in enumerate(word)]
+
+        bits = 0
+        for free in combinations(range(self.size), distance):
+            matched = self.all_bits
+            for position in range(self.size):
+                if position not in free:
+                    matched &= letter_bits[position]
+                    if not matched:
+                        break
+            bits |= matched
+
+        return bits
+
+    def get_suggestions(self, word, limit=SUGGESTION_LIMIT, max_distance=2, excluded=0):
+        """Function finds the words closest to a word that is not in the dictionary - the "did you mean" list. Words
+        with two neighbouring letters swapped (a typing slip that keeps every letter) come first, then words with one
+        wrong letter, then words with more wrong letters, up to max_distance
+
+        Parameters: self, word, limit, max_distance, excluded (a bitset of words that are never suggested - the limit
+        is still filled from the words after them)
+        returns: suggestions (in dictionary order within each group)
+        """
+
+        if len(word) != self.size:
+            return []
+
+        swap_bits = 0
+        for position in range(self.size - 1):
+            index = self.get_index(word[:position] + word[position + 1] + word[position] + word[position + 2:])
+            if index is not None:
+                swap_bits |= 1 << index
+        groups = [swap_bits] + [self.get_neighbor_bits(word, distance) for distance in range(1, max_distance + 1)]
+
+        suggestions = []
+        # found starts with word itself and the excluded words, so none of them is ever suggested
+        index = self.get_index(word)
+        found = excluded if index is None else excluded | 1 << index
+        for bits in groups:
+            bits ^= bits & found
+            found |= bits
+            # taking the lowest set bit each time reads only as many words as are needed
+            while bits and len(suggestions) < limit:
+                lowest = bits & -bits
+                suggestions.append(self.word_list[lowest.bit_length() - 1])
+                bits ^= lowest
+
+        return suggestions
+
+
+def get_signature(letters):
+    """Function gets the letter signature of a word (or of any group of letters) - see ScrabbleDict.get_signatures
+    Parameters: letters
+    returns: signature
+    """
+
+    signature = 0
+    # a letter whose bit is already set (a repeat) moves up 26 bits until it finds a free spot
+    for letter in letters:
+        bit = 1 << (ord(letter) - 65)
+        while signature & bit:
+            bit <<= 26
+        signature |= bit
+
+    return signature
+
+
+def answer_batch_chunk(task):
+    """Function answers a chunk of template queries in a worker process
+    Parameters: task (a ((templates, letters), counts_only) tuple)
+    returns: results
+    """
+
+    (templates, letters), counts_only = task
+    return shared_worker['dict1'].answer_templates(templates, letters, counts_only)
+
+
+class SharedDictionary:
+
+    def __init__(self, dict1):
+        """Initializes a shared memory block holding dict1 in the snapshot layout, so worker processes can attach to it
+        by name instead of each reading, parsing or unpickling their own copy. The block is removed by close(), or at
+        the end of a with statement
+
+        Parameters: self, dict1
+        returns: N/A
+        """
+
+        self.size = dict1.size
+        self.filename = dict1.filename
+
+        # the block is never checked against the source file, so the source stamp is left empty
+        parts = dict1.get_snapshot_parts((0, 0, bytes(32)))
+        self.memory = shared_memory.SharedMemory(create=True, size=sum([len(part) for part in parts]))
+        self.name = self.memory.name
+        offset = 0
+        for part in parts:
+            self.memory.buf[offset:offset + len(part)] = part
+            offset += len(part)
+
+    def get_handle(self):
+        """Function gets what a process needs to attach to the dictionary - see attach_dictionary
+        Parameters: self
+        returns: (name, size, filename)
+        """
+
+        return self.name, self.size, self.filename
+
+    def get_pool(self, processes, initializer=None, initargs=()):
+        """Function starts a pool of worker processes that attach to the dictionary before running initializer - a
+        worker gets the dictionary from shared_worker['dict1']
+
+        Parameters: self, processes, initializer, initargs
+        returns: pool
+        """
+
+        return multiprocessing.Pool(processes, initializer=init_shared_worker,
+                                    initargs=(self.get_handle(), initializer, initargs))
+
+    def close(self):
+        """Function removes the shared memory block - processes that are still attached keep their mapping until they
+        exit
+
+        Parameters: self
+        returns: None
+        """
+
+        if self.memory is not None:
+            self.memory.close()
+            self.memory.unlink()
+            self.memory = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class AttachedMemory(shared_memory.SharedMemory):
+
+    def close(self):
+        """Function closes the block unless an attached dictionary is still reading from it, in which case the block
+        stays mapped until the process exits
+
+        Parameters: self
+        returns: None
+        """
+
+        try:
+            super().close()
+        except BufferError:
+            pass
+
+
+# the shared memory blocks attached in this process, by name - each stays mapped for as long as the process runs
+attached = {}
+
+
+def attach_dictionary(name, size, filename):
+    """Function attaches to a dictionary published by SharedDictionary. The packed words are read straight out of the
+    shared memory block, which is mapped read-only - nothing is parsed or unpickled
+
+    Parameters: name, size, filename
+    returns: dict1
+    """
+
+    if name not in attached:
+        memory = AttachedMemory(name)
+        attached[name] = (memory, ScrabbleDict(size, filename, buffer=memory.buf))
+
+    return attached[name][1]
+
+
+def init_shared_worker(handle, initializer, initargs):
+    """Function sets up a worker process of SharedDictionary.get_pool
+    Parameters: handle (see SharedDictionary.get_handle), initializer, initargs
+    returns: None
+    """
+
+    shared_worker['dict1'] = attach_dictionary(*handle)
+    if initializer is not None:
+        initializer(*initargs)
+
+
+def get_file_stamp(filename):
+    """Function gets what a snapshot has to match to be used: the size, modification time and content hash of the
+    source file
+
+    Parameters: filename
+    returns: (size, mtime_ns, digest)
+    """
+
+    stat = os.stat(filename)
+    file = open(filename, 'rb')
+    digest = hashlib.sha256(file.read()).digest()
+    file.close()
+
+    return stat.st_size, stat.st_mtime_ns, digest
+
+
+def read_word_buckets(filename):
+    """Function reads a word file once and packs every word into a bucket for its length
+    Parameters: filename
+    returns: buckets (a dictionary of word size: array of packed words, in the order they were read)
+    """
+
+    buckets = {}
+    # seen keeps the packed words of each bucket so repeated words are skipped
+    seen = {}
+    file = open(filename, 'r')
+    for line in file:
+        new_line = line.strip('\n')
+        if 0 < len(new_line) <= MAX_WORD_SIZE:
+            code = pack_word(new_line.upper())
+            if code is None:
+                continue
+            size = len(new_line)
+            if size not in buckets:
+                buckets[size] = array('Q')
+                seen[size] = set()
+            if code not in seen[size]:
+                seen[size].add(code)
+                buckets[size].append(code)
+    file.close()
+
+    return buckets
+
+
+class WordSource:
+
+    def __init__(self, filename):
+        """Initializes the source for a word file - the file is not read until a word size is asked for
+        Parameters: self, filename
+        returns: N/A
+        """
+
+        self.filename = filename
+        self.buckets = None
+        self.stamp = None
+        self.lock = threading.Lock()
+
+    def get_stamp(self):
+        """Function gets the file's stamp (see get_file_stamp), hashing the file on the first call only
+        Parameters: self
+        returns: (size, mtime_ns, digest)
+        """
+
+        with self.lock:
+            if self.stamp is None:
+                self.stamp = get_file_stamp(self.filename)
+
+        return self.stamp
+
+    def get_buckets(self):
+        """Function gets the words of the file bucketed by length, reading the file on the first call only
+        Parameters: self
+        returns: buckets
+        """
+
+        with self.lock:
+            if self.buckets is None:
+                self.buckets = read_word_buckets(self.filename)
+
+        return self.buckets
+
+    def get_packed(self, size):
+        """Function gets the packed words of one length
+        Parameters: self, size
+        returns: packed
+        """
+
+        return self.get_buckets().get(size, array('Q'))
+
+    def get_sizes(self):
+        """Function gets every word length found in the file
+        Parameters: self
+        returns: a sorted list of sizes
+        """
+
+        return sorted(self.get_buckets())
+
+
+# the process-wide registry: one WordSource per file and one ScrabbleDict per (file, word size), shared by every game --
+# and hint in the process. ScrabbleDict has no methods that change it, so sharing one object is safe
+sources = {}
+dictionaries = {}
+registry_lock = threading.Lock()
+
+
+def get_source(filename):
+    """Function gets the shared WordSource for a file
+    Parameters: filename
+    returns: source
+    """
+
+    path = os.path.abspath(filename)
+    with registry_lock:
+        if path not in sources:
+            sources[path] = WordSource(filename)
+
+    return sources[path]
+
+
+def get_dictionary(size, filename):
+    """Function gets the shared ScrabbleDict for a file and word size, building it the first time it is asked for. The
+    file is hashed once to check the snapshots and parsed at most once, no matter how many word sizes are used - and
+    not parsed at all while the snapshots are current
+
+    Parameters: size, filename
+    returns: dict1
+    """
+
+    key = (os.path.abspath(filename), size)
+    source = get_source(filename)
+    with registry_lock:
+        if key not in dictionaries:
+            dictionaries[key] = ScrabbleDict(size, filename, source=source)
+
+    return dictionaries[key]
+
 
 def main():
 
@@ -163,7 +1241,7 @@ def main():
     dict1 = ScrabbleDict(5, 'scrabble5.txt')
 
     # Testing the create_key_list method
-    print(dict1.create_key_list())
+    print(list(dict1.create_key_list()))
 
     # Testing the check method
     print(dict1.check('ACHOO'))
@@ -175,6 +1253,12 @@ def main():
     # Testing the get_words method
     print(dict1.get_words('A'))
 
+    # Testing the get_words_with_prefix method
+    print(dict1.get_words_with_prefix('TR'))
+
+    # Testing the iter_words_with_prefix method (second page of 10 words)
+    print(list(dict1.iter_words_with_prefix('S', 10, 10)))
+
     # Testing the get_word_size method
     print(dict1.get_word_size())
 
@@ -185,6 +1269,10 @@ def main():
     template = dict1.get_masked_words('TI*E*')
     print(dict1.get_constrained_words(template, ['R']))
 
+    # Testing the count-only and paginated queries (first page of 10 words)
+    print(dict1.count_masked_words('*****'), list(dict1.iter_masked_words('*****', 0, 10)))
+    print(dict1.count_constrained_words('TI*E*', ['R']), list(dict1.iter_constrained_words('TI*E*', ['R'], limit=10)))
+
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,248 @@
+# Author: Matthew Neufeld
+# Program Description: Times the dictionary, hint queries, feedback scoring and full games on synthetic dictionaries
+# of any size, and saves the results so a run can be compared with an earlier one
+# Collaborators/References: https://docs.python.org/3/library/time.html#time.perf_counter,
+# https://docs.python.org/3/library/tracemalloc.html
+
+
+import argparse
+import json
+import os
+import random
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from Wordle175 import ScrabbleDict
+from candidates import CandidateSet
+from patterns import PatternEngine, get_pattern
+
+
+# letter weights for synthetic words, roughly the letter frequencies of scrabble5.txt (see hint.py)
+LETTER_WEIGHTS = {
+    'A': 10, 'B': 3, 'C': 3, 'D': 4, 'E': 10, 'F': 2, 'G': 3, 'H': 3, 'I': 6, 'J': 1, 'K': 2, 'L': 6, 'M': 3,
+    'N': 5, 'O': 7, 'P': 3, 'Q': 1, 'R': 6, 'S': 10, 'T': 5, 'U': 4, 'V': 1, 'W': 2, 'X': 1, 'Y': 3, 'Z': 1,
+}
+
+# the guess limit of the simulated games, the same as main.py
+GUESS_LIMIT = 6
+
+
+def make_dictionary(path, size, length, rng):
+    """Function writes a synthetic dictionary of unique random words, one word per line in sorted order like
+    scrabble5.txt
+
+    Parameters: path, size, length, rng
+    returns: None
+    """
+
+    if size > 26 ** length:
+        raise ValueError(f'there are only {26 ** length} words of length {length}')
+
+    letters = list(LETTER_WEIGHTS)
+    weights = list(LETTER_WEIGHTS.values())
+    words = set()
+    while len(words) < size:
+        for letter_list in [rng.choices(letters, weights, k=length) for word in range(size - len(words))]:
+            words.add(''.join(letter_list).lower())
+
+    file = open(path, 'w')
+    file.write('\n'.join(sorted(words)))
+    file.close()
+
+
+def measure(results, name, function, operations, repeats, setup=None):
+    """Function times function, which performs operations operations, and records it in results. The function is run
+    once under tracemalloc first, which also warms up any caches, to find the peak memory it allocates - then it is
+    timed repeats times without tracing and the median time is kept, so one slow run does not skew a comparison
+
+    Parameters: results, name, function, operations, repeats, setup (called before every run and not timed, or None)
+    returns: whatever function returns
+    """
+
+    if setup is not None:
+        setup()
+    tracemalloc.start()
+    try:
+        function()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    times = []
+    for repeat in range(repeats):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        value = function()
+        times.append(time.perf_counter() - start)
+    elapsed = statistics.median(times)
+
+    results[name] = {
+        'seconds': round(elapsed, 6),
+        'min_seconds': round(min(times), 6),
+        'max_seconds': round(max(times), 6),
+        'operations': operations,
+        'ops_per_sec': round(operations / elapsed, 2) if elapsed else None,
+        'peak_memory_kb': round(peak / 1024, 1),
+    }
+    print(f'{name.ljust(28)} {elapsed:10.4f}s {str(results[name]["ops_per_sec"]).rjust(14)} ops/s '
+          f'{str(results[name]["peak_memory_kb"]).rjust(12)} KiB')
+
+    return value
+
+
+def play_games(dict1, targets):
+    """Function plays a game against every target, always guessing the first word that could still be the target
+    Parameters: dict1, targets
+    returns: the number of games won
+    """
+
+    wins = 0
+    for target in targets:
+        candidates = CandidateSet(dict1)
+        for attempt_num in range(GUESS_LIMIT):
+            # the lowest set bit is the first candidate - no need to unpack every word that is left
+            bits = candidates.bits
+            guess = dict1.word_list[(bits & -bits).bit_length() - 1]
+            if guess == target:
+                wins += 1
+                break
+            candidates.update(guess, get_pattern(guess, target))
+
+    return wins
+
+
+def run_benchmarks(path, length, operations, games, repeats, rng):
+    """Function runs every benchmark against the dictionary file at path
+    Parameters: path, length, operations (the number of calls made to each of the fast queries), games, repeats (timed
+    runs of each benchmark), rng
+    returns: results
+    """
+
+    results = {}
+
+    dict1 = measure(results, 'load_text', lambda: ScrabbleDict(length, path, snapshot=False), 1, repeats)
+    words = list(dict1.word_list)
+    ScrabbleDict(length, path)
+    measure(results, 'load_snapshot', lambda: ScrabbleDict(length, path), 1, repeats)
+
+    # half of the checked words are in the dictionary and half are (most likely) not
+    checks = [rng.choice(words) for index in range(operations // 2)]
+    checks += [''.join(rng.choices(list(LETTER_WEIGHTS), k=length)) for index in range(operations - len(checks))]
+    measure(results, 'check', lambda: [dict1.check(word) for word in checks], len(checks), repeats)
+
+    measure(results, 'get_words', lambda: [dict1.get_words(letter) for letter in LETTER_WEIGHTS], 26, repeats)
+
+    prefixes = [rng.choice(words)[:2] for index in range(operations // 100 or 1)]
+    measure(results, 'get_words_with_prefix', lambda: [dict1.get_words_with_prefix(prefix) for prefix in prefixes],
+            len(prefixes), repeats)
+
+    # templates keep two letters of a random word, so every template matches at least one word
+    templates = []
+    for index in range(operations // 100 or 1):
+        word = rng.choice(words)
+        kept = rng.sample(range(length), min(2, length))
+        templates.append(''.join([word[position] if position in kept else '*' for position in range(length)]))
+    masked = measure(results, 'get_masked_words', lambda: [dict1.get_masked_words(template) for template in templates],
+                     len(templates), repeats)
+
+    letters = [rng.sample(list(LETTER_WEIGHTS), 2) for index in range(len(templates))]
+    measure(results, 'get_constrained_words',
+            lambda: [dict1.get_constrained_words(masked[index], letters[index]) for index in range(len(templates))],
+            len(templates), repeats)
+    measure(results, 'get_words_with_letters', lambda: [dict1.get_words_with_letters(pair) for pair in letters],
+            len(letters), repeats)
+
+    pairs = [(rng.choice(words), rng.choice(words)) for index in range(operations)]
+    # the cache is cleared before every run so each run scores every pair
+    measure(results, 'get_pattern', lambda: [get_pattern(guess, target) for guess, target in pairs], len(pairs),
+            repeats, get_pattern.cache_clear)
+
+    engine = measure(results, 'pattern_engine_init', lambda: PatternEngine(words), 1, repeats)
+    rows = min(20, len(words))
+    measure(results, 'pattern_engine_rows', lambda: [engine.get_row(words[index]) for index in range(rows)],
+            rows * len(words), repeats)
+
+    targets = [rng.choice(words) for game in range(games)]
+    measure(results, 'games', lambda: play_games(dict1, targets), games, repeats)
+
+    return results
+
+
+def get_commit():
+    """Function gets the git commit being benchmarked
+    Parameters: None
+    returns: commit hash (None outside a git checkout)
+    """
+
+    try:
+        output = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)))
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+    return output.stdout.strip()
+
+
+def display_comparison(baseline, report):
+    """Function displays the change in operations per second from a baseline report to this one
+    Parameters: baseline, report
+    returns: None
+    """
+
+    print(f'\nCompared with {baseline.get("commit")}:')
+    for size in report['runs']:
+        if size not in baseline['runs']:
+            continue
+        print(f'{size} words:')
+        for name, result in report['runs'][size].items():
+            old = baseline['runs'][size].get(name)
+            if old and old['ops_per_sec'] and result['ops_per_sec']:
+                ratio = result['ops_per_sec'] / old['ops_per_sec']
+                print(f'  {name.ljust(26)} {str(old["ops_per_sec"]).rjust(14)} -> '
+                      f'{str(result["ops_per_sec"]).rjust(14)} ops/s ({ratio:.2f}x)')
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description='Benchmarks on synthetic dictionaries')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000], help='dictionary sizes to test')
+    parser.add_argument('--length', type=int, default=5, help='word length')
+    parser.add_argument('--operations', type=int, default=20000, help='calls made to each fast query')
+    parser.add_argument('--games', type=int, default=200, help='games simulated for each size')
+    parser.add_argument('--repeats', type=int, default=5, help='timed runs of each benchmark - the median is kept')
+    parser.add_argument('--seed', type=int, default=175)
+    parser.add_argument('--output', default='benchmark.json', help='where to save the results')
+    parser.add_argument('--compare', metavar='BASELINE', help='an earlier results file to compare against')
+    args = parser.parse_args()
+
+    report = {'commit': get_commit(), 'length': args.length, 'seed': args.seed, 'repeats': args.repeats, 'runs': {}}
+    directory = tempfile.mkdtemp()
+    try:
+        for size in args.sizes:
+            rng = random.Random(args.seed)
+            print(f'\n{size} words of length {args.length}:')
+            path = os.path.join(directory, f'synthetic{size}.txt')
+            make_dictionary(path, size, args.length, rng)
+            report['runs'][str(size)] = run_benchmarks(path, args.length, args.operations, args.games, args.repeats,
+                                                       rng)
+    finally:
+        shutil.rmtree(directory)
+
+    file = open(args.output, 'w')
+    json.dump(report, file, indent=2)
+    file.close()
+    print(f'\nResults saved to {args.output}')
+
+    if args.compare:
+        file = open(args.compare, 'r')
+        baseline = json.load(file)
+        file.close()
+        display_comparison(baseline, report)
+
+
+if __name__ == "__main__":
+    main()
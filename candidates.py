@@ -0,0 +1,216 @@
+# Author: Matthew Neufeld
+# Program Description: Keeps track of the words that could still be the target word as feedback comes in over a game
+# Collaborators/References:
+
+
+import argparse
+import random
+import sys
+from Wordle175 import get_dictionary
+from patterns import GREEN, ORANGE, RED, RULE_PATTERNS, RULES, PatternEngine, get_digits
+
+
+# the letters used to type in feedback for each letter of a guess
+FEEDBACK_LETTERS = {'G': GREEN, 'O': ORANGE, 'R': RED}
+
+
+def parse_feedback(feedback):
+    """Function turns typed feedback (one of G, O or R for each letter of the guess) into a pattern code
+    Parameters: feedback
+    returns: code
+    """
+
+    code = 0
+    for letter in reversed(feedback.upper()):
+        if letter not in FEEDBACK_LETTERS:
+            raise ValueError(f'{feedback} must only contain G, O and R')
+        code = code * 3 + FEEDBACK_LETTERS[letter]
+
+    return code
+
+
+def format_feedback(code, size):
+    """Function turns a pattern code into feedback text (one of G, O or R for each letter) - the reverse of
+    parse_feedback
+
+    Parameters: code, size
+    returns: feedback
+    """
+
+    names = {FEEDBACK_LETTERS[letter]: letter for letter in FEEDBACK_LETTERS}
+
+    return ''.join([names[digit] for digit in get_digits(code, size)])
+
+
+class CandidateSet:
+
+    def __init__(self, dict1, rule='standard', engine=None):
+        """Initializes the candidate set of a game with every word in dict1. The candidates are kept as a bitset over
+        dict1.word_list, so each guess only has to AND a few bitsets from the dictionary's indexes. rule is the rule
+        the feedback was worked out with (see patterns.RULES) and engine can be a PatternEngine already built for it,
+        so many games can share one
+
+        Parameters: self, dict1, rule, engine
+        returns: N/A
+        """
+
+        if rule not in RULES:
+            raise ValueError(f'rule must be one of {RULES}')
+        self.dict1 = dict1
+        self.rule = rule
+        # the game's rule can't be turned into letter bitsets, so its feedback is matched against a full pattern row
+        self.engine = None
+        if rule != 'standard':
+            self.engine = engine if engine is not None else PatternEngine(dict1.word_list, rule)
+        self.bits = dict1.all_bits
+        # history keeps every (guess, code) the set has been narrowed by
+        self.history = []
+        # the positional letter counts of the candidates - worked out by get_position_counts when first asked for
+        self.position_counts = None
+
+    def update(self, guess, code):
+        """Function removes the candidates that could not have given code as feedback for guess. A Green letter must be
+        in that position and every other letter must not be. For each letter, the number of Green and Orange copies is
+        the least number of copies the target can have - and if any copy was Red, it is the exact number
+
+        With any other rule, the candidates are the words whose pattern code against guess is exactly code
+
+        Parameters: self, guess, code
+        returns: None
+        """
+
+        self.history.append((guess, code))
+        self.position_counts = None
+        if self.engine is not None:
+            row = self.engine.get_row(guess)
+            # the first word is the lowest bit, so the bit string is built from the last word back
+            if self.engine.width == 1:
+                matches = row.translate(bytes([49 if value == code else 48 for value in range(256)]))[::-1]
+            else:
+                matches = ''.join(['1' if value == code else '0' for value in reversed(self.engine.decode_row(row))])
+            self.bits &= int(matches, 2)
+            return
+
+        digits = get_digits(code, len(guess))
+
+        found = {}
+        has_red = set()
+        for position in range(len(guess)):
+            letter = guess[position]
+            letter_bits = self.dict1.position_index[position].get(letter, 0)
+            if digits[position] == GREEN:
+                self.bits &= letter_bits
+            else:
+                # removing the words with letter at position
+                self.bits ^= self.bits & letter_bits
+
+            if digits[position] == RED:
+                has_red.add(letter)
+            else:
+                found[letter] = found.get(letter, 0) + 1
+
+        for letter in set(guess):
+            count = found.get(letter, 0)
+            self.bits &= self.dict1.get_count_bits(letter, count)
+            if letter in has_red:
+                # removing the words with more copies of letter than were found
+                self.bits ^= self.bits & self.dict1.get_count_bits(letter, count + 1)
+
+    def update_feedback(self, guess, feedback):
+        """Function narrows the candidates with typed feedback (for example: GORRG)
+        Parameters: self, guess, feedback
+        returns: None
+        """
+
+        if len(feedback) != len(guess):
+            raise ValueError(f'{feedback} must have one letter for every letter of {guess}')
+        self.update(guess, parse_feedback(feedback))
+
+    def get_size(self):
+        """Function gets the number of words that could still be the target word
+        Parameters: self
+        returns: size
+        """
+
+        return self.bits.bit_count()
+
+    def get_position_counts(self):
+        """Function counts how many candidates have each letter in each position - see ScrabbleDict.get_position_counts.
+        The counts are kept until the next update, and before any update they are the dictionary's own counts
+
+        Parameters: self
+        returns: position_counts
+        """
+
+        if self.position_counts is None:
+            if self.bits == self.dict1.all_bits:
+                self.position_counts = self.dict1.get_position_counts()
+            else:
+                self.position_counts = self.dict1.get_position_counts(self.bits)
+
+        return self.position_counts
+
+    def get_words(self):
+        """Function gets the words that could still be the target word
+        Parameters: self
+        returns: word_list
+        """
+
+        return self.dict1.bits_to_words(self.bits)
+
+    def iter_words(self, offset=0, limit=None):
+        """Function goes through the words that could still be the target word one page at a time
+        Parameters: self, offset (number of words to skip), limit (most words to give, None for all)
+        returns: a generator of words
+        """
+
+        return self.dict1.iter_bits(self.bits, offset, limit)
+
+    def check(self, word):
+        """Function determines whether a word could still be the target word
+        Parameters: self, word
+        returns: True or False
+        """
+
+        if len(word) != self.dict1.size:
+            return False
+        bits = self.bits
+        for position, letter in enumerate(word):
+            bits &= self.dict1.position_index[position].get(letter, 0)
+
+        return bool(bits)
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description='Play random games and check that the target word always stays a '
+                                                 'candidate')
+    parser.add_argument('--games', type=int, default=1000, help='number of games to play')
+    parser.add_argument('--rule', choices=RULES, default='game', help='the rule the feedback is worked out with')
+    parser.add_argument('--seed', type=int, default=None, help='seed for the random targets and guesses')
+    args = parser.parse_args()
+
+    dict1 = get_dictionary(5, 'scrabble5.txt')
+    get_code = RULE_PATTERNS[args.rule]
+    engine = PatternEngine(dict1.word_list, args.rule) if args.rule != 'standard' else None
+    rng = random.Random(args.seed)
+    lost = 0
+    for _ in range(args.games):
+        target = rng.choice(dict1.word_list)
+        candidates = CandidateSet(dict1, args.rule, engine)
+        # the guesses are random words, so repeated letters and unlikely feedback are both covered
+        for _ in range(6):
+            guess = rng.choice(dict1.word_list)
+            candidates.update(guess, get_code(guess, target))
+            if not candidates.check(target):
+                lost += 1
+                print(f'{target} was removed after {", ".join([word for word, code in candidates.history])}')
+                break
+
+    print(f'{args.games - lost} of {args.games} games kept the target word ({args.rule} rule)')
+    if lost:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,40 +1,162 @@
 # Author: Matthew Neufeld
 # Program Description: Creates scrabble5.txt from corrupted Word5Dict.txt file
-# Collaborators/References:
+# Collaborators/References: https://en.wikipedia.org/wiki/External_sorting,
+# https://docs.python.org/3/library/heapq.html#heapq.merge
 
 
-def new_file(filename):
-    """Function takes a corrupted word file and produces a new file with each word by itself on its own line
-    Parameters: filename
-    returns: None
+import heapq
+import multiprocessing
+import os
+import shutil
+import tempfile
+from collections import deque
+
+
+# how many characters are read from the corrupted file at a time
+CHUNK_SIZE = 1 << 20
+
+# how many unique words are kept in memory before they are sorted and spilled to a temporary run file
+MAX_WORDS = 1 << 20
+
+# how many bytes are buffered before the output file is written to
+WRITE_BUFFER = 1 << 16
+
+
+def read_chunks(filename, chunk_size):
+    """Function reads the corrupted file in fixed-size chunks. Each chunk is cut at its last '#' or newline and the
+    rest is carried over to the next chunk, so a word split across two reads is put back together
+
+    Parameters: filename, chunk_size
+    returns: a generator of chunks that only contain whole words
     """
 
     file = open(filename, 'r')
-    # .readlines() turns the data into a list
-    corrupted = file.readlines()
+    carry = ''
+    while True:
+        data = file.read(chunk_size)
+        if not data:
+            break
+        data = carry + data
+        cut = max(data.rfind('#'), data.rfind('\n'))
+        # a chunk with no separator at all is one long partial word - it is carried over whole
+        if cut == -1:
+            carry = data
+            continue
+        carry = data[cut + 1:]
+        yield data[:cut]
+    file.close()
+
+    if carry:
+        yield carry
+
+
+def clean_chunk(chunk, length):
+    """Function splits a chunk into words, normalizes them (trimmed, lower case, letters only) and drops the words that
+    are not the right length
+
+    Parameters: chunk, length (None keeps words of every length)
+    returns: words (a set)
+    """
+
+    words = set()
+    # items in the chunk are words separated by # characters or newlines
+    for word in chunk.replace('\n', '#').split('#'):
+        word = word.strip().lower()
+        # ensuring that there are no blank or malformed items
+        if word and word.isascii() and word.isalpha() and (length is None or len(word) == length):
+            words.add(word)
+
+    return words
+
+
+def clean_chunks(filename, chunk_size, length, processes):
+    """Function cleans every chunk of the corrupted file, spreading the chunks across worker processes if there is
+    more than one - only a few chunks are ever waiting on the workers at a time, so memory use stays bounded
+
+    Parameters: filename, chunk_size, length, processes
+    returns: a generator of sets of words
+    """
+
+    if processes == 1:
+        for chunk in read_chunks(filename, chunk_size):
+            yield clean_chunk(chunk, length)
+        return
+
+    pool = multiprocessing.Pool(processes)
+    pending = deque()
+    try:
+        for chunk in read_chunks(filename, chunk_size):
+            pending.append(pool.apply_async(clean_chunk, (chunk, length)))
+            if len(pending) >= 2 * processes:
+                yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()
+    finally:
+        pool.terminate()
+
+
+def spill_run(words, directory):
+    """Function writes a set of words to a temporary run file in sorted order
+    Parameters: words, directory
+    returns: path
+    """
+
+    file = tempfile.NamedTemporaryFile('w', dir=directory, suffix='.run', delete=False, buffering=WRITE_BUFFER)
+    for word in sorted(words):
+        file.write(word + '\n')
+    file.close()
+
+    return file.name
+
+
+def read_run(path):
+    """Function reads the words back from a run file
+    Parameters: path
+    returns: a generator of words, in sorted order
+    """
+
+    file = open(path, 'r')
+    for line in file:
+        yield line.rstrip('\n')
     file.close()
-    all_words = []
-    # items in corrupted are chunks of words with #, so use split method to make each word its own item - separating --
-    # at each # character
-    for chunk in corrupted:
-        word_list = chunk.split('#')
-        for word in word_list:
-            # removing the newline character and adding each cleaned word to the all_word list
-            new_word = word.strip('\n')
-            all_words.append(new_word)
-
-    # ensuring that there are no blank items in the all_words list
-    if '' in all_words:
-        all_words.remove('')
-
-    scrabble5 = open('scrabble5.txt', 'w')
-    for index in range(len(all_words)):
-        # prevents the creation of a blank line at the very end
-        if index == len(all_words) - 1:
-            scrabble5.write(all_words[index])
-        # ensures that every word is on its own line
-        else:
-            scrabble5.write(all_words[index] + '\n')
+
+
+def new_file(filename, output='scrabble5.txt', length=5, processes=1, chunk_size=CHUNK_SIZE, max_words=MAX_WORDS):
+    """Function takes a corrupted word file and produces a new file with each word by itself on its own line, sorted
+    and without repeats. The corrupted file is streamed in chunks - when too many unique words have been seen they are
+    spilled to sorted run files, which are merged at the end, so memory use does not grow with the size of the file
+
+    Parameters: filename, output, length, processes, chunk_size, max_words
+    returns: None
+    """
+
+    run_directory = tempfile.mkdtemp(dir=os.path.dirname(os.path.abspath(output)))
+    try:
+        runs = []
+        words = set()
+        for chunk_words in clean_chunks(filename, chunk_size, length, processes):
+            words |= chunk_words
+            if len(words) >= max_words:
+                runs.append(spill_run(words, run_directory))
+                words = set()
+
+        # merging every run with the words still in memory - repeats from different runs end up next to each other
+        sources = [read_run(path) for path in runs]
+        sources.append(sorted(words))
+
+        scrabble5 = open(output, 'w', buffering=WRITE_BUFFER)
+        previous = None
+        for word in heapq.merge(*sources):
+            if word == previous:
+                continue
+            # prevents the creation of a blank line at the very end - every word after the first starts a new line
+            if previous is not None:
+                scrabble5.write('\n')
+            scrabble5.write(word)
+            previous = word
+        scrabble5.close()
+    finally:
+        shutil.rmtree(run_directory)
 
 
 def main():
@@ -43,4 +165,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
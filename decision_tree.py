@@ -0,0 +1,534 @@
+# Author: Matthew Neufeld
+# Program Description: Builds a decision tree of the recommended guess after every possible feedback history, saves it
+# in a compact file and looks up the next guess in it without any scoring
+# Collaborators/References: https://docs.python.org/3/library/mmap.html,
+# https://docs.python.org/3/library/multiprocessing.html
+
+
+import argparse
+import heapq
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+from bisect import bisect_left
+from collections import deque
+from Wordle175 import SharedDictionary, get_dictionary, shared_worker
+from patterns import RULE_PATTERNS, RULES, PatternEngine, PatternMatrix, get_digest
+from solver import METRICS, get_bucket_sizes, score_buckets
+
+
+# every target should be found within this many guesses - when no root guess manages it, the tree that needs the
+# fewest extra guesses is saved instead
+GUESS_LIMIT = 6
+
+# the tree follows the feedback of main.py's game, so its edges are the game's pattern codes (see patterns.RULES)
+TREE_RULE = 'game'
+
+# nodes with this many candidates or fewer are searched for the guess that needs the fewest guesses in the worst case
+# (and then in total) - bigger nodes take the best scoring guess that still finds every candidate within the limit
+FULL_SEARCH_SIZE = 24
+
+# how many of the best guesses out of every word are tried at a node - the best scoring ones at a big node, then the
+# ones that split its candidates into the most groups
+TRIED_GUESSES = 8
+
+# how many of the best scoring words, and then of the words that split the word list into the most groups, are tried
+# as the root guess
+ROOT_GUESSES = 4
+
+# a tree file starts with: magic, number of words, number of nodes, number of children, most guesses any target needs,
+# the rule of its pattern codes (an index into patterns.RULES), dictionary digest
+TREE_MAGIC = b'WRDTREE2'
+TREE_HEADER = '<8sIIIII32s'
+
+# the pattern matrix and metric used by build_branch - set once in each worker by init_worker
+worker_state = {}
+
+
+def rank_guesses(matrix, candidates, metric, count):
+    """Function ranks every word as a guess by how well it splits up the candidates - ties go to guesses that are
+    candidates
+
+    Parameters: matrix, candidates, metric, count (how many of the best guesses are kept)
+    returns: guess indexes, best first
+    """
+
+    candidate_set = set(candidates)
+    keys = []
+    for guess_index in range(len(matrix.word_list)):
+        score = score_buckets(get_bucket_sizes(matrix.get_row(guess_index), candidates), len(candidates), metric)
+        keys.append((score, guess_index not in candidate_set, guess_index))
+
+    return [key[2] for key in heapq.nsmallest(count, keys)]
+
+
+def rank_splits(matrix, candidates, count):
+    """Function ranks every word as a guess by how many groups it splits the candidates into - much faster than
+    rank_guesses, since each guess' codes come straight out of the candidates' columns of the matrix
+
+    Parameters: matrix, candidates, count (how many of the best guesses are kept)
+    returns: guess indexes, best first
+    """
+
+    columns = [matrix.get_column(index) for index in candidates]
+    group_counts = list(map(len, map(set, zip(*columns))))
+
+    return heapq.nlargest(count, range(len(group_counts)), key=group_counts.__getitem__)
+
+
+def rank_roots(matrix, metric):
+    """Function ranks the root guesses to try: the best scoring words, then the words that split the whole word list
+    into the most groups
+
+    Parameters: matrix, metric
+    returns: guess indexes, best first
+    """
+
+    ranked = rank_guesses(matrix, list(range(len(matrix.word_list))), metric, ROOT_GUESSES)
+    # rank_splits would zip every column of the matrix at once, so at the root each row's groups are counted instead
+    group_counts = [len(get_bucket_sizes(matrix.get_row(index), None)) for index in range(len(matrix.word_list))]
+    splits = heapq.nlargest(ROOT_GUESSES, range(len(group_counts)), key=group_counts.__getitem__)
+
+    return ranked + [guess_index for guess_index in splits if guess_index not in ranked]
+
+
+def split_candidates(matrix, guess_index, candidates):
+    """Function groups the candidates by the pattern code they give for a guess
+    Parameters: matrix, guess_index, candidates
+    returns: buckets (a dictionary of code: candidate indexes)
+    """
+
+    row = matrix.get_row(guess_index)
+    buckets = {}
+    for index in candidates:
+        buckets.setdefault(row[index], []).append(index)
+
+    return buckets
+
+
+def try_guess(matrix, guess_index, candidates, metric, win_code, guesses_left, memo, best=None):
+    """Function builds the subtree for a group of candidates that starts with a given guess
+    Parameters: matrix, guess_index, candidates, metric, win_code, guesses_left (guesses the subtree may use, counting
+    this one), memo, best (the subtree to beat, or None)
+    returns: (node, total guesses, most guesses), or None if some candidate cannot be found within guesses_left or the
+    subtree cannot beat best
+    """
+
+    buckets = split_candidates(matrix, guess_index, candidates)
+    # a guess that leaves every candidate in one group is no closer to the target
+    if len(buckets) == 1 and win_code not in buckets:
+        return None
+
+    if best is not None:
+        # every candidate is guessed at here once, and a group of n words needs at least 2n - 1 more guesses (two for --
+        # all but the first word guessed), so most guesses can be ruled out without building anything
+        fewest = len(candidates) + sum([2 * len(buckets[code]) - 1 for code in buckets if code != win_code])
+        shallowest = 3 if max([len(buckets[code]) for code in buckets if code != win_code]) > 1 else 2
+        if (shallowest, fewest) >= (best[2], best[1]):
+            return None
+        guesses_left = min(guesses_left, best[2])
+
+    children = []
+    total = len(candidates)
+    most = 1
+    # the biggest groups are the most likely not to fit, so they are built first
+    for code in sorted(buckets, key=lambda code: -len(buckets[code])):
+        # the win code means the guess was the target - there is nothing left to guess
+        if code != win_code:
+            result = build_node(matrix, buckets[code], metric, win_code, guesses_left - 1, memo)
+            if result is None:
+                return None
+            children.append((code, result[0]))
+            total += result[1]
+            most = max(most, result[2] + 1)
+
+    return (guess_index, sorted(children)), total, most
+
+
+def get_failed_group(matrix, guess_index, candidates, win_code, guesses_left, memo):
+    """Function finds the group of candidates that kept a guess from fitting in guesses_left, once try_guess has
+    given up on it
+
+    Parameters: matrix, guess_index, candidates, win_code, guesses_left, memo
+    returns: candidate indexes (None if no group is known to have failed)
+    """
+
+    buckets = split_candidates(matrix, guess_index, candidates)
+    for code in buckets:
+        group = buckets[code]
+        if code != win_code and len(group) > 1:
+            if guesses_left < 3 or memo.get((tuple(group), guesses_left - 1), True) is None:
+                return group
+
+    return None
+
+
+def iter_tried_guesses(matrix, candidates, metric, win_code, guesses_left, memo):
+    """Function goes through the guesses tried at a big group of candidates: the best scoring guesses, then the ones
+    that split the candidates into the most groups, then the ones that split up the group that kept the best scoring
+    guess from fitting the most - each list is only ranked if nothing before it fit
+
+    Parameters: matrix, candidates, metric, win_code, guesses_left, memo
+    returns: a generator of guess indexes
+    """
+
+    ranked = rank_guesses(matrix, candidates, metric, TRIED_GUESSES)
+    yield from ranked
+    tried = set(ranked)
+    for guess_index in rank_splits(matrix, candidates, TRIED_GUESSES):
+        if guess_index not in tried:
+            tried.add(guess_index)
+            yield guess_index
+
+    # a few words that only differ in one letter (like BILLS, FILLS, GILLS, ...) are often what keeps a guess from
+    # fitting, and the guesses that tell them apart can be far down both rankings
+    group = get_failed_group(matrix, ranked[0], candidates, win_code, guesses_left, memo)
+    if group is not None:
+        for guess_index in rank_splits(matrix, group, TRIED_GUESSES):
+            if guess_index not in tried:
+                tried.add(guess_index)
+                yield guess_index
+
+
+def get_best_subtree(matrix, guesses, candidates, metric, win_code, guesses_left, memo, best=None):
+    """Function finds the subtree with the fewest guesses in the worst case (then in total) out of the ones that start
+    with each of the guesses
+
+    Parameters: matrix, guesses, candidates, metric, win_code, guesses_left, memo, best (the subtree to beat, or None)
+    returns: (node, total guesses, most guesses), or best if none of the guesses beat it
+    """
+
+    for guess_index in guesses:
+        result = try_guess(matrix, guess_index, candidates, metric, win_code, guesses_left, memo, best)
+        if result is not None and (best is None or (result[2], result[1]) < (best[2], best[1])):
+            best = result
+
+    return best
+
+
+def build_node(matrix, candidates, metric, win_code, guesses_left, memo):
+    """Function builds the subtree for a group of candidates that finds every one of them within guesses_left. Small
+    groups get the subtree with the fewest guesses in the worst case (then in total) out of every candidate and the
+    best TRIED_GUESSES words as the first guess - bigger groups get the first of the best TRIED_GUESSES words that fits
+
+    Parameters: matrix, candidates, metric, win_code, guesses_left (guesses the subtree may use, counting its own),
+    memo (a dictionary of the subtrees already built)
+    returns: (node, total guesses, most guesses), or None if some candidate cannot be found within guesses_left - node
+    is a (guess index, [(code, child node), ...]) tuple, children sorted by code
+    """
+
+    if len(candidates) == 1:
+        return (candidates[0], []), 1, 1
+    if guesses_left < 2:
+        return None
+    if len(candidates) == 2:
+        # guessing either candidate finds the other one with the next guess
+        code = matrix.get_row(candidates[0])[candidates[1]]
+        return (candidates[0], [(code, (candidates[1], []))]), 3, 2
+
+    key = (tuple(candidates), guesses_left)
+    if key in memo:
+        return memo[key]
+
+    if len(candidates) <= FULL_SEARCH_SIZE:
+        best = get_best_subtree(matrix, candidates, candidates, metric, win_code, guesses_left, memo)
+        # nothing beats a candidate that tells every other candidate apart (one guess for it and two for each of the
+        # rest), so the other words are only ranked when no candidate does
+        if best is None or (best[2], best[1]) != (2, 2 * len(candidates) - 1):
+            guesses = rank_splits(matrix, candidates, TRIED_GUESSES)
+            best = get_best_subtree(matrix, guesses, candidates, metric, win_code, guesses_left, memo, best)
+    else:
+        best = None
+        for guess_index in iter_tried_guesses(matrix, candidates, metric, win_code, guesses_left, memo):
+            best = try_guess(matrix, guess_index, candidates, metric, win_code, guesses_left, memo)
+            if best is not None:
+                break
+
+    memo[key] = best
+    return best
+
+
+def init_worker(path, word_list, width, metric):
+    """Function sets up a worker process - every worker memory-maps the same pattern matrix file
+    Parameters: path, word_list (None uses the words of the dictionary attached by SharedDictionary.get_pool), width,
+    metric
+    returns: None
+    """
+
+    if word_list is None:
+        word_list = shared_worker['dict1'].word_list
+    worker_state['matrix'] = PatternMatrix(path, word_list, width)
+    worker_state['metric'] = metric
+
+
+def build_branch(branch):
+    """Function builds the subtree under one child of the root
+    Parameters: branch (a (code, candidate indexes, guesses left) tuple - the root's guess is not counted)
+    returns: (code, node, most guesses), node and most guesses are None if some candidate cannot be found within the
+    guesses left
+    """
+
+    code, candidates, guesses_left = branch
+    matrix = worker_state['matrix']
+    win_code = 3 ** len(matrix.word_list[0]) - 1
+
+    result = build_node(matrix, candidates, worker_state['metric'], win_code, guesses_left, {})
+    if result is None:
+        return code, None, None
+    return code, result[0], result[2]
+
+
+def build_branches(shared, matrix, path, metric, branches, processes, stop_on_failure):
+    """Function builds the subtrees of some of the root's children across a pool of worker processes
+
+    Parameters: shared (the SharedDictionary the workers attach to), matrix, path (the matrix file), metric, branches
+    (see build_branch), processes, stop_on_failure (True stops at the first subtree that does not fit)
+    returns: a dictionary of code: (node, most guesses) - a subtree that does not fit has None for both, and the
+    branches after it are left out when stop_on_failure is True
+    """
+
+    results = {}
+
+    def collect(built):
+        for code, node, most in built:
+            results[code] = (node, most)
+            if node is None and stop_on_failure:
+                break
+
+    if processes == 1:
+        init_worker(path, matrix.word_list, matrix.width, metric)
+        collect(map(build_branch, branches))
+    else:
+        # leaving the with statement terminates the pool, so a worker still building a branch that is not needed --
+        # does not hold up the next root
+        with shared.get_pool(processes, init_worker, (path, None, matrix.width, metric)) as pool:
+            collect(pool.imap_unordered(build_branch, branches))
+
+    return results
+
+
+def build_tree(dict1, metric='entropy', processes=None, directory='.'):
+    """Function builds the whole decision tree. The root guesses from rank_roots are tried in turn, with the subtrees
+    of each root's children built across a pool of worker processes, until one finds every target within GUESS_LIMIT
+    guesses. If none does, the first root is kept and each subtree that does not fit is given one more guess at a time
+    until it does
+
+    Parameters: dict1, metric, processes (defaults to the number of cores), directory
+    returns: (root node, most guesses any target needs)
+    """
+
+    engine = PatternEngine(dict1.word_list, TREE_RULE)
+    matrix = engine.get_matrix(directory)
+    path = engine.get_matrix_path(directory)
+    win_code = 3 ** dict1.get_word_size() - 1
+    processes = processes or os.cpu_count() or 1
+
+    candidates = list(range(len(matrix.word_list)))
+    first = None
+    # the workers attach to one shared copy of the words instead of each being sent the whole list
+    with SharedDictionary(dict1) as shared:
+        for root_guess in rank_roots(matrix, metric):
+            buckets = split_candidates(matrix, root_guess, candidates)
+            # the biggest branches are sent first, as they are the most likely not to fit and so no worker is left --
+            # with a big one at the end
+            branches = sorted([(code, buckets[code], GUESS_LIMIT - 1) for code in buckets if code != win_code],
+                              key=lambda branch: -len(branch[1]))
+            results = build_branches(shared, matrix, path, metric, branches, processes, True)
+            if len(results) == len(branches) and None not in [node for node, most in results.values()]:
+                break
+            if first is None:
+                first = root_guess, branches, results
+        else:
+            # every root leaves some targets past the limit - the first (best ranked) root's missing and failed --
+            # branches are rebuilt with one more guess each round until they all fit
+            root_guess, branches, results = first
+            guesses_left = GUESS_LIMIT - 1
+            while None in [results.get(code, (None, None))[0] for code, group, limit in branches]:
+                guesses_left += 1
+                retried = [(code, group, guesses_left) for code, group, limit in branches
+                           if results.get(code, (None, None))[0] is None]
+                results.update(build_branches(shared, matrix, path, metric, retried, processes, False))
+
+    children = sorted([(code, results[code][0]) for code in results])
+    most = max([results[code][1] for code in results], default=0) + 1
+
+    return (root_guess, children), most
+
+
+def get_tree_path(dict1, directory='.'):
+    """Function gets the file name of the decision tree for a dictionary - the name includes the word list's content
+    hash so a changed word list never loads an old tree
+
+    Parameters: dict1, directory
+    returns: path
+    """
+
+    digest = get_digest(dict1.word_list)
+    return os.path.join(directory, f'tree-{TREE_RULE}-{dict1.get_word_size()}-{digest[:16]}.bin')
+
+
+def save_tree(root, dict1, path, most, rule=TREE_RULE):
+    """Function saves a tree as five flat uint32 arrays. Node i has a guess, the position of its first child and its
+    number of children. Children are stored as a node number and a pattern code, sorted by code within each node
+
+    Parameters: root, dict1, path, most (the most guesses any target needs), rule (the rule of the pattern codes)
+    returns: None
+    """
+
+    node_guesses = []
+    node_starts = []
+    node_counts = []
+    child_nodes = []
+    child_codes = []
+
+    # nodes are numbered in the order they are queued (breadth first), so a child's number is known when it is queued
+    queue = deque([root])
+    queued = 1
+    while queue:
+        guess_index, children = queue.popleft()
+        node_guesses.append(guess_index)
+        node_starts.append(len(child_nodes))
+        node_counts.append(len(children))
+        for code, child in children:
+            child_codes.append(code)
+            child_nodes.append(queued)
+            queued += 1
+            queue.append(child)
+
+    digest = bytes.fromhex(get_digest(dict1.word_list))
+    header = struct.pack(TREE_HEADER, TREE_MAGIC, dict1.get_size(), len(node_guesses), len(child_nodes), most,
+                         RULES.index(rule), digest)
+
+    # writing to a temporary file first means another process never maps a half-written tree
+    temp_path = f'{path}.{os.getpid()}.tmp'
+    file = open(temp_path, 'wb')
+    file.write(header)
+    for values in (node_guesses, node_starts, node_counts, child_nodes, child_codes):
+        file.write(struct.pack(f'<{len(values)}I', *values))
+    file.close()
+    os.replace(temp_path, path)
+
+
+class DecisionTree:
+
+    def __init__(self, path, dict1):
+        """Initializes the tree by memory-mapping a file saved by save_tree - nothing is read until a lookup
+        Parameters: self, path, dict1
+        returns: N/A
+        """
+
+        self.dict1 = dict1
+
+        file = open(path, 'rb')
+        self.buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        file.close()
+
+        magic, word_count, node_count, child_count, most, rule, digest = struct.unpack_from(TREE_HEADER, self.buffer)
+        if magic != TREE_MAGIC or word_count != dict1.get_size() or rule >= len(RULES):
+            raise ValueError(f'{path} is not a decision tree for this dictionary')
+        if digest.hex() != get_digest(dict1.word_list):
+            raise ValueError(f'{path} was built from a different word list')
+        # most is the most guesses any target needs - more than GUESS_LIMIT when no tree within the limit was found
+        self.most = most
+        # the rule of the pattern codes the tree's edges are keyed by
+        self.rule = RULES[rule]
+
+        # the arrays are read straight out of the mapped file, which stores them little-endian
+        view = memoryview(self.buffer)[struct.calcsize(TREE_HEADER):]
+        if sys.byteorder == 'little':
+            view = view.cast('I')
+        else:
+            values = array('I')
+            values.frombytes(view)
+            values.byteswap()
+            view = memoryview(values)
+
+        self.node_guesses = view[0:node_count]
+        self.node_starts = view[node_count:2 * node_count]
+        self.node_counts = view[2 * node_count:3 * node_count]
+        self.child_nodes = view[3 * node_count:3 * node_count + child_count]
+        self.child_codes = view[3 * node_count + child_count:3 * node_count + 2 * child_count]
+
+    def get_guess(self, history):
+        """Function follows the tree down the feedback history of a game to the recommended next guess - one binary
+        search over a node's children for each guess made, and no scoring
+
+        Parameters: self, history (a list of (guess, pattern code) tuples, in the order they were played - the codes
+        must follow self.rule)
+        returns: the recommended guess, or None if the game has left the tree (a guess other than the recommended one
+        was played, or the target was already found)
+        """
+
+        node = 0
+        win_code = 3 ** self.dict1.get_word_size() - 1
+        for guess, code in history:
+            if self.dict1.word_list[self.node_guesses[node]] != guess or code == win_code:
+                return None
+            start = self.node_starts[node]
+            stop = start + self.node_counts[node]
+            index = bisect_left(self.child_codes, code, start, stop)
+            if index == stop or self.child_codes[index] != code:
+                return None
+            node = self.child_nodes[index]
+
+        return self.dict1.word_list[self.node_guesses[node]]
+
+    def get_guess_count(self, target):
+        """Function plays a game against target by following the tree
+        Parameters: self, target
+        returns: the number of guesses needed
+        """
+
+        get_code = RULE_PATTERNS[self.rule]
+        history = []
+        guess = self.get_guess(history)
+        while guess != target:
+            history.append((guess, get_code(guess, target)))
+            guess = self.get_guess(history)
+
+        return len(history) + 1
+
+
+def load_tree(dict1, directory='.'):
+    """Function loads the decision tree for a dictionary if it has been built
+    Parameters: dict1, directory
+    returns: DecisionTree (None if the tree has not been built)
+    """
+
+    path = get_tree_path(dict1, directory)
+    if not os.path.exists(path):
+        return None
+
+    return DecisionTree(path, dict1)
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description='Builds the decision tree of recommended guesses')
+    parser.add_argument('--metric', choices=METRICS, default='entropy', help='how each node picks its guess')
+    parser.add_argument('--processes', type=int, help='worker processes (defaults to the core count)')
+    args = parser.parse_args()
+
+    # establishing the dictionary
+    dict1 = get_dictionary(5, 'scrabble5.txt')
+
+    start = time.perf_counter()
+    root, most = build_tree(dict1, args.metric, args.processes)
+    path = get_tree_path(dict1)
+    save_tree(root, dict1, path, most)
+    print(f'Built {path} in {time.perf_counter() - start:.1f}s')
+    if most > GUESS_LIMIT:
+        print(f'Warning: no tree finds every target within {GUESS_LIMIT} guesses - some targets need up to {most}')
+
+    # checking the tree by playing a game against every word
+    tree = DecisionTree(path, dict1)
+    guess_counts = [tree.get_guess_count(target) for target in dict1.word_list]
+    print(f'Opening guess: {tree.get_guess([])}, average guesses: {round(sum(guess_counts) / len(guess_counts), 3)}, '
+          f'most guesses: {max(guess_counts)}')
+
+
+if __name__ == "__main__":
+    main()
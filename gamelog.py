@@ -0,0 +1,237 @@
+# Author: Matthew Neufeld
+# Program Description: Records every finished game in a compact append-only binary log, and reads the log back to
+# report the hardest target words, the average number of guesses and the most common opening guesses
+# Collaborators/References: https://docs.python.org/3/library/struct.html, https://docs.python.org/3/library/mmap.html
+
+
+import argparse
+import mmap
+import os
+import struct
+import time
+from collections import Counter
+from Wordle175 import LETTER_BITS, WordView, pack_word
+from patterns import RULES
+
+
+# every game has room for this many guesses - the guess limit of main.py and server.py
+GUESS_SLOTS = 6
+
+# a log file starts with: magic, record size, the rule every pattern code in it was worked out with (an index into --
+# patterns.RULES)
+LOG_MAGIC = b'WRDLOG02'
+LOG_HEADER = '<8sII'
+
+# every game is one fixed-width record: time (seconds since the epoch), word size, number of guesses, target, then --
+# GUESS_SLOTS packed guesses and GUESS_SLOTS pattern codes (unused slots are 0)
+RECORD_FORMAT = f'<IBBQ{GUESS_SLOTS}Q{GUESS_SLOTS}I'
+
+# records are kept in memory until this many bytes are waiting, then written with one call
+FLUSH_SIZE = 1 << 16
+
+RECORD = struct.Struct(RECORD_FORMAT)
+HEADER_SIZE = struct.calcsize(LOG_HEADER)
+
+
+class GameLog:
+
+    def __init__(self, path, rule):
+        """Initializes a log that appends to path, writing the header if the file is new. Every code in one log follows
+        the same rule, so a log started with another rule is never appended to
+
+        Parameters: self, path, rule (the rule of the pattern codes that will be recorded - see patterns.RULES)
+        returns: N/A
+        """
+
+        if rule not in RULES:
+            raise ValueError(f'rule must be one of {RULES}')
+        if os.path.exists(path) and os.path.getsize(path):
+            logged_rule = check_header(path)
+            if logged_rule != rule:
+                raise ValueError(f'{path} holds pattern codes of the {logged_rule} rule, not the {rule} rule')
+
+        self.path = path
+        self.rule = rule
+        self.file = open(path, 'ab')
+        if self.file.tell() == 0:
+            self.file.write(struct.pack(LOG_HEADER, LOG_MAGIC, RECORD.size, RULES.index(rule)))
+            self.file.flush()
+        self.buffer = bytearray()
+
+    def record_game(self, target, guesses, codes):
+        """Function adds a finished game to the log. The record is only packed into memory here - it is written when
+        FLUSH_SIZE bytes are waiting or the log is closed, so recording a game never waits on the disk
+
+        Parameters: self, target, guesses (in the order they were played), codes (the pattern code of each guess)
+        returns: None
+        """
+
+        if len(guesses) > GUESS_SLOTS or len(guesses) != len(codes):
+            raise ValueError(f'a game has one code for each of at most {GUESS_SLOTS} guesses')
+
+        packed = [pack_word(guess) for guess in guesses] + [0] * (GUESS_SLOTS - len(guesses))
+        codes = list(codes) + [0] * (GUESS_SLOTS - len(codes))
+        self.buffer += RECORD.pack(int(time.time()), len(target), len(guesses), pack_word(target), *packed, *codes)
+        if len(self.buffer) >= FLUSH_SIZE:
+            self.flush()
+
+    def flush(self):
+        """Function writes every waiting record with a single call - whole records only, so a reader never sees part
+        of a game
+
+        Parameters: self
+        returns: None
+        """
+
+        if self.buffer:
+            self.file.write(self.buffer)
+            self.file.flush()
+            self.buffer = bytearray()
+
+    def close(self):
+        """Function writes the waiting records and closes the file
+        Parameters: self
+        returns: None
+        """
+
+        self.flush()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def check_header(path):
+    """Function makes sure a file is a game log with records of the current format
+    Parameters: path
+    returns: rule (the rule of the log's pattern codes)
+    """
+
+    file = open(path, 'rb')
+    header = file.read(HEADER_SIZE)
+    file.close()
+
+    if len(header) != HEADER_SIZE:
+        raise ValueError(f'{path} is not a game log')
+    magic, record_size, rule = struct.unpack(LOG_HEADER, header)
+    if magic != LOG_MAGIC or record_size != RECORD.size or rule >= len(RULES):
+        raise ValueError(f'{path} is not a game log of this format')
+
+    return RULES[rule]
+
+
+def read_records(path):
+    """Function goes through every game in a log. The file is memory-mapped and unpacked one record at a time, so a log
+    of millions of games is never loaded into memory - a record cut off by a crash at the end of the file is skipped
+
+    Parameters: path
+    returns: a generator of (time, size, target, guesses, codes) tuples - target and guesses are still packed
+    """
+
+    check_header(path)
+    file = open(path, 'rb')
+    try:
+        if os.fstat(file.fileno()).st_size == HEADER_SIZE:
+            return
+        buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    finally:
+        file.close()
+
+    view = memoryview(buffer)
+    stop = HEADER_SIZE + (len(buffer) - HEADER_SIZE) // RECORD.size * RECORD.size
+    try:
+        for record in RECORD.iter_unpack(view[HEADER_SIZE:stop]):
+            guess_count = record[2]
+            yield (record[0], record[1], record[3], record[4:4 + guess_count],
+                   record[4 + GUESS_SLOTS:4 + GUESS_SLOTS + guess_count])
+    finally:
+        view.release()
+        buffer.close()
+
+
+def analyze(path):
+    """Function works out the stats of every game in a log in one pass
+    Parameters: path
+    returns: stats (a dictionary of the log's rule, games, wins, the guesses needed for each win, and per-target and
+    opener counts)
+    """
+
+    stats = {'rule': check_header(path), 'games': 0, 'wins': 0, 'guess_counts': Counter(), 'targets': {},
+             'openers': Counter()}
+    for game_time, size, target, guesses, codes in read_records(path):
+        stats['games'] += 1
+        # a game is won when its last guess was the target - a lost game counts as one guess over the limit
+        won = bool(guesses) and guesses[-1] == target
+        guess_count = len(guesses) if won else GUESS_SLOTS + 1
+        if won:
+            stats['wins'] += 1
+            stats['guess_counts'][guess_count] += 1
+
+        # targets[target] is [games, total guesses, losses]
+        target_stats = stats['targets'].setdefault(target, [0, 0, 0])
+        target_stats[0] += 1
+        target_stats[1] += guess_count
+        target_stats[2] += not won
+
+        if guesses:
+            stats['openers'][guesses[0]] += 1
+
+    return stats
+
+
+def display_analytics(stats, top, min_games):
+    """Function displays the win rate, the average guesses, the hardest targets and the most common openers
+    Parameters: stats, top (number of targets and openers to show), min_games (fewest games a target needs to be
+    ranked)
+    returns: None
+    """
+
+    if not stats['games']:
+        print('No games have been logged')
+        return
+
+    def unpack(code):
+        # the first letter is never 0, so the number of letters is the number of 5-bit groups the code uses
+        return WordView([], (code.bit_length() + LETTER_BITS - 1) // LETTER_BITS).unpack_word(code)
+
+    wins = stats['wins']
+    print(f'{stats["games"]} games, {wins} wins ({round(wins / stats["games"] * 100, 2)}%), '
+          f'pattern codes of the {stats["rule"]} rule')
+    if wins:
+        guesses = sum([count * games for count, games in stats['guess_counts'].items()])
+        print(f'Average guesses to win: {round(guesses / wins, 3)}')
+        for count in sorted(stats['guess_counts']):
+            print(f'{count}: {str(stats["guess_counts"][count]).rjust(8)}')
+
+    # the hardest targets need the most guesses on average, losses counted as one guess over the limit
+    ranked = [(total / games, losses, target) for target, (games, total, losses) in stats['targets'].items()
+              if games >= min_games]
+    ranked.sort(key=lambda item: (-item[0], -item[1]))
+    print(f'\nHardest targets (at least {min_games} games):')
+    for average, losses, target in ranked[:top]:
+        print(f'{unpack(target)}: {round(average, 3)} guesses, {losses} losses out of {stats["targets"][target][0]}')
+
+    print('\nMost common openers:')
+    for opener, games in stats['openers'].most_common(top):
+        print(f'{unpack(opener)}: {games} ({round(games / stats["games"] * 100, 2)}%)')
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description='Reports on the games recorded in a game log')
+    parser.add_argument('path', help='the game log (see --log in main.py and server.py)')
+    parser.add_argument('--top', type=int, default=10, help='number of targets and openers to show')
+    parser.add_argument('--min-games', type=int, default=5, help='fewest games a target needs to be ranked')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    stats = analyze(args.path)
+    display_analytics(stats, args.top, args.min_games)
+    print(f'\nRead {stats["games"]} games in {time.perf_counter() - start:.2f}s')
+
+
+if __name__ == "__main__":
+    main()
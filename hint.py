@@ -3,26 +3,31 @@
 # Collaborators/References:
 
 
-from Wordle175 import ScrabbleDict
+import argparse
+import sys
+from Wordle175 import get_dictionary
+from candidates import CandidateSet
+from decision_tree import load_tree
+from profiler import enable_dictionary_profiling, enable_memory_tracing, instrument, write_report
+from solver import METRICS, Solver
 
 
-def get_letter_count(word_list):
-    """Function counts every occurrence of each letter in the complete word dictionary
-    Parameters: word_list
+def get_letter_count(position_counts):
+    """Function counts every occurrence of each letter in the complete word dictionary (or any group of its words) by
+    adding up the positional counts - see ScrabbleDict.get_position_counts
+
+    Parameters: position_counts
     returns: sorted(letter_count.items())
     """
 
-    # function is similar to letter_counting() in main.py, except it takes a list as a parameter and returns a tuple
-    # word_list is a list of all the words in the dictionary based off scrabble5.txt
+    # the positional counts come straight from the dictionary's index, so no word has to be gone through letter by --
+    # letter here
 
     letter_count = {}
-    for word in word_list:
-        for letter in word:
-            if letter not in letter_count:
-                # initializing each letter with a value of 0
-                letter_count[letter] = 0
-            # +1 is added to the value of the letter every time the letter appears in the list
-            letter_count[letter] += 1
+    for counts in position_counts:
+        for letter in counts:
+            # each position adds its number of words with letter there
+            letter_count[letter] = letter_count.get(letter, 0) + counts[letter]
 
     # sorted(letter_count.items()) is a list of alphabetically sorted tuples consisting of a letter and its number of --
     # occurrences
@@ -48,6 +53,20 @@ def display_stats(letter_count):
         print(f'{a_tuple[0]}: {str(a_tuple[1]).rjust(4)} {str(round(float((a_tuple[1] / all_letters) * 100), 2)).rjust(5)}% {int(round(((a_tuple[1] / all_letters) * 100))) * "*".ljust(1)}')
 
 
+def display_position_stats(position_counts, top=5):
+    """Function displays the most common letters in each position and the percentage of words with that letter there
+    Parameters: position_counts, top (number of letters shown for each position)
+    returns: None
+    """
+
+    for position, counts in enumerate(position_counts):
+        # every word has exactly one letter in each position, so the counts of a position add up to the number of words
+        total = sum(counts.values())
+        ranked = sorted(counts.items(), key=lambda item: (-item[1], item[0]))[:top]
+        print(f'Position {position + 1}: ' + ', '.join([f'{letter} {round(count / total * 100, 1)}%'
+                                                        for letter, count in ranked]))
+
+
 def get_wildcard_list(template):
     """Function gets the wildcards ('*') from a template and stores them in a list.
     Parameters: template
@@ -63,20 +82,127 @@ def get_wildcard_list(template):
     return wildcard_list
 
 
-def main():
+def positive_int(text):
+    """Function converts a command line argument to a whole number of at least 1 - used as an argparse type
+    Parameters: text
+    returns: number
+    """
+
+    try:
+        number = int(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'{text} is not a whole number')
+    if number < 1:
+        raise argparse.ArgumentTypeError(f'{text} is less than 1')
+
+    return number
+
+
+def display_page(count, page, offset):
+    """Function displays how many words could be the target word and one page of them - the rest of the words are
+    never made into a list, so a template that matches most of the dictionary shows up just as fast
+
+    Parameters: count, page (a list of the words on the page), offset (number of words before the page)
+    returns: None
+    """
+
+    if page:
+        print(f'{count} possible words (showing {offset + 1} to {offset + len(page)}):')
+    else:
+        print(f'{count} possible words')
+    print(page)
+
+
+def display_suggestions(dict1, candidates, top_k, metric):
+    """Function ranks every word in the dictionary as the next guess against the words that could still be the target
+    word and displays the best ones. Rankings are streamed from the solver as chunks of guesses are scored, so the
+    final ranking is the last one received.
+
+    Parameters: dict1, candidates, top_k, metric
+    returns: None
+    """
+
+    solver = Solver(dict1)
+    ranking = []
+    for ranking in solver.suggest(candidates, top_k, metric):
+        pass
+
+    print(f'Best next guesses ({metric}) out of {len(candidates)} possible target words:')
+    for word, score in ranking:
+        print(f'{word}: {score}')
+
 
-    # establishing the dictionary
-    dict1 = ScrabbleDict(5, 'scrabble5.txt')
+def display_game_hints(dict1, args):
+    """Function narrows down the words that could be the target word one guess at a time. The user enters each guess
+    and the feedback the game gave for it, and only the words that are still possible are kept for the next guess.
 
-    # getting the list of all words in the dictionary
-    word_list = dict1.create_key_list()
+    Parameters: dict1, args
+    returns: None
+    """
+
+    # the feedback comes from main.py's game, so it is matched with the game's own rule
+    candidates = CandidateSet(dict1, 'game')
+
+    # the decision tree gives the recommended guess straight from the feedback history, without any scoring
+    tree = None
+    if args.tree:
+        tree = load_tree(dict1)
+        if tree is None:
+            print('No decision tree has been built for this dictionary - run decision_tree.py first')
+        else:
+            print(f'Recommended first guess: {tree.get_guess(candidates.history)}')
+
+    while candidates.get_size() > 1:
+        guess = input('Enter your guess (leave blank to stop): ').upper()
+        if not guess:
+            break
+        if len(guess) != dict1.get_word_size():
+            print(f'{guess} is not {dict1.get_word_size()} letters long')
+            continue
+
+        # feedback is entered as one letter for each letter of the guess: G for Green, O for Orange, R for Red
+        feedback = input('Enter the feedback (G = Green, O = Orange, R = Red) for each letter: ')
+        try:
+            candidates.update_feedback(guess, feedback)
+        except ValueError as error:
+            print(error)
+            continue
+
+        display_page(candidates.get_size(), list(candidates.iter_words(0, args.page_size)), 0)
+        # the positional counts only cover the words that are left, so they show which letters to try where next
+        display_position_stats(candidates.get_position_counts())
+        if tree is not None:
+            # the tree only knows the histories that followed its own recommendations
+            recommended = tree.get_guess(candidates.history)
+            if recommended is not None:
+                print(f'Recommended next guess: {recommended}')
+        if args.suggest and candidates.get_size() > 1:
+            display_suggestions(dict1, candidates.get_words(), args.top, args.metric)
+
+
+def provide_hints(dict1, args):
+    """Function displays the letter stats of the dictionary and then provides hints on what the target word could be,
+    either from a template or from the feedback of each guess (--game).
+
+    Parameters: dict1, args
+    returns: None
+    """
+
+    # getting the number of words with each letter in each position - kept by the dictionary after the first time
+    position_counts = dict1.get_position_counts()
     # getting the number of occurrences for each letter
-    letter_count = get_letter_count(word_list)
-    # displaying the stats of each letter
+    letter_count = get_letter_count(position_counts)
+    # displaying the stats of each letter, then of each letter in each position
     display_stats(letter_count)
+    display_position_stats(position_counts)
 
     # PROVIDING HINTS:
 
+    # --game carries the feedback of every guess over to the next one instead of asking for a template
+    if args.game:
+        display_game_hints(dict1, args)
+        return
+
     # prompting user to enter a template and getting wildcard_list
     template = input('Enter template: ').upper()
     wildcard_list = get_wildcard_list(template)
@@ -86,13 +212,55 @@ def main():
         # prompting user to enter letters if they want extended hints - optional, enter 1 if extended hints not wanted
         letters = list(input('Enter capital letters that could replace wildcards for extended hints. Enter 1 if you do not want extended hints: '))
         if letters == ['1']:
-            # shows user a list of all words that could be the target word
-            print(dict1.get_masked_words(template))
+            # the bitset of all words that could be the target word
+            bits = dict1.get_masked_bits(template)
         # validating that there are not more wildcards than letters
         elif len(letters) < len(wildcard_list):
-            # shows user a list of all words that could be the target word given the indicated letters
-            template1 = dict1.get_masked_words(template)
-            print(dict1.get_constrained_words(template1, letters))
+            # the bitset of all words that could be the target word given the indicated letters
+            bits = dict1.get_constrained_bits(template, letters)
+        else:
+            return
+
+        # shows user the number of words that could be the target word and the requested page of them
+        offset = (args.page - 1) * args.page_size
+        display_page(bits.bit_count(), list(dict1.iter_bits(bits, offset, args.page_size)), offset)
+
+        if args.suggest and bits:
+            display_suggestions(dict1, dict1.bits_to_words(bits), args.top, args.metric)
+
+
+def main():
+
+    # --suggest ranks the best next guess after the hints are shown
+    parser = argparse.ArgumentParser(description='Provides hints on what the target word could be')
+    parser.add_argument('--suggest', action='store_true', help='rank the best next guesses for the possible words')
+    parser.add_argument('--top', type=int, default=10, help='number of suggested guesses to show')
+    parser.add_argument('--metric', choices=METRICS, default='entropy', help='how suggested guesses are ranked')
+    parser.add_argument('--game', action='store_true', help='narrow the possible words with the feedback of each guess')
+    parser.add_argument('--tree', action='store_true', help='with --game, show the decision tree\'s recommended guess')
+    parser.add_argument('--page-size', type=positive_int, default=50, help='number of possible words shown at a time')
+    parser.add_argument('--page', type=positive_int, default=1, help='which page of the possible words to show')
+    parser.add_argument('--profile', nargs='?', const='-', metavar='FILE',
+                        help='profile the hot paths and print the report, or write it to FILE (JSON if FILE ends in .json)')
+    parser.add_argument('--profile-memory', action='store_true',
+                        help='with --profile, also measure the memory allocated during each call (slower)')
+    args = parser.parse_args()
+
+    # the hot paths are only instrumented when asked for, and before the dictionary is loaded so loading is counted
+    if args.profile:
+        if args.profile_memory:
+            enable_memory_tracing()
+        enable_dictionary_profiling()
+        for function in ('get_letter_count', 'display_suggestions'):
+            instrument(sys.modules[__name__], function, f'hint.{function}')
+
+    try:
+        # establishing the dictionary
+        dict1 = get_dictionary(5, 'scrabble5.txt')
+        provide_hints(dict1, args)
+    finally:
+        if args.profile:
+            write_report(args.profile)
 
 
 if __name__ == "__main__":
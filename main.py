@@ -4,8 +4,14 @@
 # https://www.youtube.com/watch?v=JapurB9UCSg
 
 
+import argparse
 import random
-from Wordle175 import ScrabbleDict
+import sys
+from Wordle175 import get_dictionary
+from gamelog import GameLog
+from patterns import GREEN, ORANGE, get_digits, get_game_pattern
+from profiler import enable_dictionary_profiling, enable_memory_tracing, instrument, write_report
+from simulate import STRATEGIES, display_report, simulate
 
 
 def get_target(dict1):
@@ -21,6 +27,37 @@ def get_target(dict1):
     return target_word
 
 
+def validate_guess(guess, dict1, guessed_words):
+    """Function makes sure that a guess is valid.
+    Parameters: guess, dict1, guessed_words
+    returns: the reason the guess is not valid, or None if it is valid
+    """
+
+    # checking if the length of guess does not exceed the word size
+    # dict1.get_word_size() = 5
+    if len(guess) > dict1.get_word_size():
+        return f'{guess} is too long'
+    elif len(guess) < dict1.get_word_size():
+        return f'{guess} is too short'
+
+    # guess must be in the dictionary to be valid - the closest words are suggested in case it was a typo
+    elif not dict1.check(guess):
+        # words that have already been guessed would only be rejected again, so they are never suggested
+        excluded = 0
+        for word in guessed_words:
+            excluded |= 1 << dict1.get_index(word)
+        suggestions = dict1.get_suggestions(guess, excluded=excluded)
+        if suggestions:
+            return f'{guess} is not a recognized word - did you mean {", ".join(suggestions)}?'
+        return f'{guess} is not a recognized word'
+
+    # no repeat guesses - therefore guess_words is relevant and guess cannot be in guessed_words to be valid
+    elif guess in guessed_words:
+        return f'{guess} has already been guessed'
+
+    return None
+
+
 def get_guess(attempt_num, dict1, guessed_words):
     """Function prompts user to enter in a guess. Function also makes sure that the entered guess is valid.
     Parameters: attempt_num, dict1, guessed_words
@@ -34,20 +71,9 @@ def get_guess(attempt_num, dict1, guessed_words):
         # .upper() is used to meet display requirements
         guess = input(f'Attempt {attempt_num}: Please enter a five-letter word: ').upper()
 
-        # checking if the length of guess does not exceed the word size
-        # dict1.get_word_size() = 5
-        if len(guess) > dict1.get_word_size():
-            print(f'{guess} is too long')
-        elif len(guess) < dict1.get_word_size():
-            print(f'{guess} is too short')
-
-        # guess must be in the dictionary to be valid
-        elif not dict1.check(guess):
-            print(f'{guess} is not a recognized word')
-
-        # no repeat guesses - therefore guess_words is relevant and guess cannot be in guessed_words to be valid
-        elif guess in guessed_words:
-            print(f'{guess} has already been guessed')
+        error = validate_guess(guess, dict1, guessed_words)
+        if error:
+            print(error)
 
         # if no issue is raised, the guess will be returned and valid_guess = True so the loop will end
         # the valid guess is also stored in guess_words so it cannot be guessed again
@@ -73,20 +99,6 @@ def formatting(colour):
     return colour
 
 
-def create_letter_list(word):
-    """Function takes a word and makes a list containing all of its letters.
-    Parameters: word
-    returns: letter_list
-    """
-
-    # every letter in the particular word wil be added to letter_list
-    letter_list = []
-    for letter in word:
-        letter_list.append(letter)
-
-    return letter_list
-
-
 def letter_counting(word):
     """Function takes word and counts each occurrence of the letter within the word. Results are stored in a dictionary.
     Parameters: word
@@ -104,107 +116,73 @@ def letter_counting(word):
     return letter_count
 
 
-def letter_enumeration(letter_count, letter_list):
-    """Function enumerates letters in a word based on how many times they appear in the word.
-    Parameters: letter_count, letter_list
-    returns: letter_list
-    """
-
-    # num_letter_list will contain all letters that have been enumerated
-    num_letter_list = []
-
-    for key in letter_count:
-        # letters that only appear in a word once are left alone
-        if letter_count[key] > 1:
-
-            # the following chunk of code performs the enumeration
-            # x is just a variable that takes on the enumeration value
-            # letter[key] is the amount of times a letter occurs in the word - it determines the extent of the numbering
-            # +1 is added in the range to turn for example: E, E1 --> E1, E2
-            for x in range(1, letter_count[key] + 1):
-                # key is the letter - it is concatenated with the enumeration value and added to num_letter_list
-                numbered_letter = key + str(x)
-                num_letter_list.append(numbered_letter)
-
-                # the following chunk of code performs the replacement of non-numbered letters with numbered letters
-                for replace_letter in range(len(letter_list)):
-                    for num_ch in num_letter_list:
-                        # at this point, only keys with >1 occurrences can be accessed, if a letter in letter_list is
-                        # the same as a key, then it must be replaced by ch, which is the enumerated letter
-                        if letter_list[replace_letter] == key:
-                            letter_list[replace_letter] = num_ch
-                            # num_ch is popped from the list during each ch assignment to ensure that a num_ch is not --
-                            # assigned more than once
-                            num_letter_list.pop()
-
-    # updated letter_list is returned with enumerated values (if letters occur multiple times)
-    return letter_list
+def render_feedback(guess, pattern):
+    """Function turns the pattern code of a guess into the text shown to the user. Letters that appear more than once
+    in the guess are enumerated from left to right (for example: E1, E2) so every letter can be told apart.
 
-
-def feedback(guess, target_word):
-    """Function provides feedback to the user based on how guess relates to target word. If a letter in the guess is in
-    Green, it means the letter is in the target word and in the right position. If a letter is in Orange, it means the
-    letter is in the target word, but not in the right position. If a letter is in Red, it means that the letter is not
-    in the target word.
-
-    Parameters: guess, target_word
-    returns: None
+    Parameters: guess, pattern
+    returns: the feedback line
     """
 
     green = []
     orange = []
     red = []
 
-    # creating letter lists for guess and target_word
-    guess_letter_list = create_letter_list(guess)
-    target_letter_list = create_letter_list(target_word)
-
-    # counting all the letters in guess and target_word
-    guess_letter_counter = letter_counting(guess)
-    target_letter_counter = letter_counting(target_word)
-
-    # enumerating each letter in guess and target_word
-    guess_letter_list = letter_enumeration(guess_letter_counter, guess_letter_list)
-    target_letter_list = letter_enumeration(target_letter_counter, target_letter_list)
-
-    for guess_letter in range(len(guess_letter_list)):
-
-        # letters will only be added to green if the non-numbered letter in the same position for each list are equal
-        if guess_letter_list[guess_letter][0] == target_letter_list[guess_letter][0]:
-            green.append(guess_letter_list[guess_letter])
-
-        # if the letter is only in the target list than it goes into orange
-        # checking guess_letter_list[guess_letter][0] in target_word to account for guesses with no repeating letters
-        elif guess_letter_list[guess_letter] in target_letter_list or guess_letter_list[guess_letter][0] in target_word:
-            # ensures that user isn't misled by multiple guess letters being in orange when there is only one of the --
-            # guess_letter in the word
-            if target_letter_counter[target_letter_list[guess_letter][0]] < guess_letter_counter[guess_letter_list[guess_letter][0]]:
-                red.append(guess_letter_list[guess_letter])
-            else:
-                orange.append(guess_letter_list[guess_letter])
-
-        # every other letter (letters not in the target word) go into red
+    letter_count = letter_counting(guess)
+    # numbered keeps track of how many times each repeated letter has been enumerated so far
+    numbered = {}
+    digits = get_digits(pattern, len(guess))
+
+    for position in range(len(guess)):
+        letter = guess[position]
+        # letters that only appear in the guess once are left alone
+        if letter_count[letter] > 1:
+            numbered[letter] = numbered.get(letter, 0) + 1
+            letter = letter + str(numbered[letter])
+
+        if digits[position] == GREEN:
+            green.append(letter)
+        elif digits[position] == ORANGE:
+            orange.append(letter)
         else:
-            red.append(guess_letter_list[guess_letter])
+            red.append(letter)
 
     # giving feedbacks proper display requirements
     green = formatting(green)
     orange = formatting(orange)
     red = formatting(red)
 
-    print(f'{guess} Green={green} – Orange={orange} – Red={red}')
+    return f'{guess} Green={green} – Orange={orange} – Red={red}'
 
 
-def main():
+def feedback(guess, target_word):
+    """Function provides feedback to the user based on how guess relates to target word. If a letter in the guess is in
+    Green, it means the letter is in the target word and in the right position. If a letter is in Orange, it means the
+    letter is in the target word, but not in the right position. If a letter is in Red, it means that the letter is not
+    in the target word.
+
+    Parameters: guess, target_word
+    returns: None
+    """
+
+    # get_game_pattern does the scoring and caches the result - render_feedback only builds the text
+    print(render_feedback(guess, get_game_pattern(guess, target_word)))
 
-    # establishing the dictionary
-    dict1 = ScrabbleDict(5, 'scrabble5.txt')
+
+def play_game(dict1, log=None):
+    """Function plays one interactive game of Wordle.
+    Parameters: dict1, log (a GameLog the finished game is recorded in, or None)
+    returns: None
+    """
 
     # getting the target word
     target_word = get_target(dict1)
 
     # guessed words is initially empty and will have valid guesses after each attempt
     guessed_words = []
+    # the feedback line and pattern code of every valid guess - each guess is only scored once
+    feedback_lines = []
+    codes = []
 
     # win is initially set to False - it will be become True if the player guesses the target word
     win = False
@@ -216,8 +194,10 @@ def main():
         guess = get_guess(attempt_num, dict1, guessed_words)
 
         # feedback will be displayed for each guess on every attempt
-        for guess in guessed_words:
-            feedback(guess, target_word)
+        codes.append(get_game_pattern(guess, target_word))
+        feedback_lines.append(render_feedback(guess, codes[-1]))
+        for line in feedback_lines:
+            print(line)
 
         attempt_num += 1
 
@@ -230,6 +210,50 @@ def main():
     if not win:
         print(f'Sorry you lose. The Word is {target_word}')
 
+    if log is not None:
+        log.record_game(target_word, guessed_words, codes)
+
+
+def main():
+
+    # --simulate plays games headlessly instead of prompting the player
+    parser = argparse.ArgumentParser(description='Implementation of the Wordle game')
+    parser.add_argument('--simulate', type=int, metavar='GAMES', help='play GAMES games without prompts and report')
+    parser.add_argument('--strategy', choices=sorted(STRATEGIES), default='entropy', help='guess strategy to simulate')
+    parser.add_argument('--processes', type=int, help='worker processes for --simulate (defaults to the core count)')
+    parser.add_argument('--seed', type=int, help='random seed for --simulate')
+    parser.add_argument('--log', metavar='FILE', help='record the game in the game log FILE (see gamelog.py)')
+    parser.add_argument('--profile', nargs='?', const='-', metavar='FILE',
+                        help='profile the hot paths and print the report, or write it to FILE (JSON if FILE ends in .json)')
+    parser.add_argument('--profile-memory', action='store_true',
+                        help='with --profile, also measure the memory allocated during each call (slower)')
+    args = parser.parse_args()
+
+    # the hot paths are only instrumented when asked for, and before the dictionary is loaded so loading is counted
+    if args.profile:
+        if args.profile_memory:
+            enable_memory_tracing()
+        enable_dictionary_profiling()
+        for function in ('feedback', 'render_feedback', 'get_game_pattern'):
+            instrument(sys.modules[__name__], function, f'main.{function}')
+
+    try:
+        # establishing the dictionary
+        dict1 = get_dictionary(5, 'scrabble5.txt')
+
+        if args.simulate:
+            results, elapsed = simulate(dict1, args.simulate, args.strategy, args.processes, args.seed)
+            display_report(results, elapsed)
+        elif args.log:
+            # the log's codes are the game's own feedback (see patterns.get_game_pattern)
+            with GameLog(args.log, 'game') as log:
+                play_game(dict1, log)
+        else:
+            play_game(dict1)
+    finally:
+        if args.profile:
+            write_report(args.profile)
+
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,400 @@
+# Author: Matthew Neufeld
+# Program Description: Computes Green/Orange/Red feedback patterns for many guesses against many targets at once and
+# stores the full guess x answer pattern matrix on disk
+# Collaborators/References: https://docs.python.org/3/library/mmap.html,
+# https://en.wikipedia.org/wiki/SWAR
+
+
+import hashlib
+import mmap
+import os
+import sys
+from array import array
+from functools import lru_cache
+from Wordle175 import get_dictionary
+
+
+# every letter of a guess is given a digit - the pattern code of a guess is the base-3 number made from its digits, --
+# with the digit for the first letter in the lowest place
+RED = 0
+ORANGE = 1
+GREEN = 2
+
+# get_pattern keeps the codes of this many recent (guess, target) pairs
+PATTERN_CACHE_SIZE = 1 << 16
+
+# the rules a pattern code can be worked out with - 'standard' is the usual Wordle rule (get_pattern) and 'game' is the
+# rule the interactive game in main.py has always shown (get_game_pattern)
+RULES = ('standard', 'game')
+
+
+def lane_width(size):
+    """Function gets the number of bytes needed to hold one pattern code for words of a given size
+    Parameters: size
+    returns: width
+    """
+
+    # the biggest pattern code is 3 ** size - 1 (every letter Green)
+    width = 1
+    while 3 ** size > 256 ** width:
+        width *= 2
+
+    return width
+
+
+def lane_typecode(width):
+    """Function gets the array typecode for a lane width
+    Parameters: width
+    returns: typecode
+    """
+
+    for typecode in 'BHIL':
+        if array(typecode).itemsize == width:
+            return typecode
+
+
+def get_digest(word_list):
+    """Function gets the content hash of a word list - used to name the pattern matrix file for that word list
+    Parameters: word_list
+    returns: digest
+    """
+
+    digest = hashlib.sha256('\n'.join(word_list).encode('ascii')).hexdigest()
+
+    return digest
+
+
+@lru_cache(maxsize=PATTERN_CACHE_SIZE)
+def get_pattern(guess, target):
+    """Function gets the pattern code of a single guess against a single target word. The first pass marks the Greens
+    and counts the target letters that are left over, the second pass gives out Oranges from those counts
+
+    Parameters: guess, target
+    returns: code
+    """
+
+    digits = [RED] * len(guess)
+    left_over = {}
+    for position in range(len(guess)):
+        if guess[position] == target[position]:
+            digits[position] = GREEN
+        else:
+            left_over[target[position]] = left_over.get(target[position], 0) + 1
+
+    # a letter is only Orange while there are unmatched copies of it in the target
+    for position in range(len(guess)):
+        letter = guess[position]
+        if digits[position] == RED and left_over.get(letter, 0) > 0:
+            digits[position] = ORANGE
+            left_over[letter] -= 1
+
+    code = 0
+    for digit in reversed(digits):
+        code = code * 3 + digit
+
+    return code
+
+
+@lru_cache(maxsize=PATTERN_CACHE_SIZE)
+def get_game_pattern(guess, target):
+    """Function gets the pattern code of a single guess against a single target word the way the interactive game
+    always has. A letter that is in the target word but not in the right position is Red instead of Orange when the
+    guess has more copies of it than the target word has of the letter in the same position
+
+    Parameters: guess, target
+    returns: code
+    """
+
+    code = 0
+    for position in range(len(guess) - 1, -1, -1):
+        letter = guess[position]
+        if letter == target[position]:
+            digit = GREEN
+        elif letter in target and target.count(target[position]) >= guess.count(letter):
+            digit = ORANGE
+        else:
+            digit = RED
+        code = code * 3 + digit
+
+    return code
+
+
+# the single-pair version of each rule
+RULE_PATTERNS = {'standard': get_pattern, 'game': get_game_pattern}
+
+
+def get_digits(code, size):
+    """Function turns a pattern code back into its list of digits (RED, ORANGE or GREEN for every letter)
+    Parameters: code, size
+    returns: digits
+    """
+
+    digits = []
+    for position in range(size):
+        digits.append(code % 3)
+        code //= 3
+
+    return digits
+
+
+class PatternEngine:
+
+    def __init__(self, word_list, rule='standard'):
+        """Initializes the engine for a list of target words. Each word is encoded as a row in a uint8 letter array and
+        every (position, letter) and (letter, count) pair is turned into a lane mask: a big int with one lane per target
+        word. Adding and masking these ints works on every target at the same time
+
+        Parameters: self, word_list, rule (one of RULES)
+        returns: N/A
+        """
+
+        if rule not in RULES:
+            raise ValueError(f'rule must be one of {RULES}')
+        self.rule = rule
+        self.word_list = list(word_list)
+        self.size = len(self.word_list[0])
+        self.width = lane_width(self.size)
+        self.digest = get_digest(self.word_list)
+
+        # letters is the uint8 letter array: the letters of word i are letters[i * size:(i + 1) * size]
+        self.letters = bytes(''.join(self.word_list), 'ascii')
+
+        # ones has the value 1 in every lane, high has 128 in every lane (used for comparing lanes)
+        self.ones = self.lanes_to_int(bytes([1]) * len(self.word_list))
+        self.high = self.ones * 128
+
+        # position_masks[position][letter] has a 1 in the lane of every target with letter at position
+        self.position_masks = []
+        for position in range(self.size):
+            column = self.letters[position::self.size]
+            letter_masks = {}
+            for letter in set(column):
+                table = bytearray(256)
+                table[letter] = 1
+                letter_masks[letter] = self.lanes_to_int(column.translate(table))
+            self.position_masks.append(letter_masks)
+
+        # count_masks[letter] holds how many times letter appears in each target - adding the position masks is safe --
+        # because a lane can never go past size
+        self.count_masks = {}
+        for letter_masks in self.position_masks:
+            for letter in letter_masks:
+                self.count_masks[letter] = self.count_masks.get(letter, 0) + letter_masks[letter]
+
+        # own_counts[position] holds how many times each target has its own letter at position - only the game's rule --
+        # needs it
+        self.own_counts = []
+        if rule == 'game':
+            for position in range(self.size):
+                counts = bytes([word.count(word[position]) for word in self.word_list])
+                self.own_counts.append(self.lanes_to_int(counts))
+
+    def lanes_to_int(self, values):
+        """Function packs a bytes object with one value per target into a lane int
+        Parameters: self, values
+        returns: lanes
+        """
+
+        # each value takes up the lowest byte of its lane - the rest of the lane is left as 0
+        if self.width == 1:
+            return int.from_bytes(values, 'little')
+        packed = bytearray(len(values) * self.width)
+        packed[0::self.width] = values
+        return int.from_bytes(packed, 'little')
+
+    def get_row(self, guess):
+        """Function gets the pattern code of guess against every target word
+        Parameters: self, guess
+        returns: row (bytes - one little-endian lane of self.width bytes per target)
+        """
+
+        guess = guess.upper().encode('ascii')
+        if self.rule == 'game':
+            return self.get_game_row(guess)
+
+        # the positions of each letter of the guess - repeated letters are handled together
+        letter_positions = {}
+        for position, letter in enumerate(guess):
+            letter_positions.setdefault(letter, []).append(position)
+
+        row = 0
+        for letter in letter_positions:
+            positions = letter_positions[letter]
+            count = self.count_masks.get(letter, 0)
+            greens = [self.position_masks[position].get(letter, 0) for position in positions]
+            green_total = sum(greens)
+
+            # a letter that is not Green is Orange only while the target still has copies of that letter left over --
+            # after the Greens and the earlier non-Green copies in the guess - need is that number plus one
+            earlier = 0
+            for position, green in zip(positions, greens):
+                not_green = self.ones - green
+                need = green_total + earlier + self.ones
+                # lanes where count >= need end up with bit 7 set, no lane can borrow from its neighbour
+                enough = ((count + self.high - need) >> 7) & self.ones
+                orange = enough & not_green
+                row += (GREEN * green + ORANGE * orange) * 3 ** position
+                earlier += not_green
+
+        return row.to_bytes(len(self.word_list) * self.width, 'little')
+
+    def get_game_row(self, guess):
+        """Function gets the pattern code of guess against every target word with the game's rule - see
+        get_game_pattern
+
+        Parameters: self, guess (ASCII bytes)
+        returns: row (bytes - one little-endian lane of self.width bytes per target)
+        """
+
+        row = 0
+        for position, letter in enumerate(guess):
+            green = self.position_masks[position].get(letter, 0)
+            # lanes where the target has the letter at all
+            present = ((self.count_masks.get(letter, 0) + self.high - self.ones) >> 7) & self.ones
+            # lanes where the target has at least as many copies of its own letter at position as guess has of letter
+            enough = ((self.own_counts[position] + self.high - guess.count(letter) * self.ones) >> 7) & self.ones
+            orange = (self.ones - green) & present & enough
+            row += (GREEN * green + ORANGE * orange) * 3 ** position
+
+        return row.to_bytes(len(self.word_list) * self.width, 'little')
+
+    def get_rows(self, guesses):
+        """Function gets the rows of pattern codes for many guesses against every target word
+        Parameters: self, guesses
+        returns: a generator of rows, in the same order as guesses
+        """
+
+        for guess in guesses:
+            yield self.get_row(guess)
+
+    def decode_row(self, row):
+        """Function turns a row from get_row into a list of pattern codes
+        Parameters: self, row
+        returns: codes
+        """
+
+        if self.width == 1:
+            return list(row)
+        codes = array(lane_typecode(self.width))
+        codes.frombytes(row)
+        if sys.byteorder != 'little':
+            codes.byteswap()
+        return codes.tolist()
+
+    def get_matrix_path(self, directory='.'):
+        """Function gets the file name of the pattern matrix for this word list - the name includes the content hash so
+        a changed word list never loads an old matrix
+
+        Parameters: self, directory
+        returns: path
+        """
+
+        # the standard rule keeps the name it has always had
+        prefix = 'patterns' if self.rule == 'standard' else f'patterns-{self.rule}'
+        return os.path.join(directory, f'{prefix}-{self.size}-{self.digest[:16]}.bin')
+
+    def save_matrix(self, path):
+        """Function computes the full guess x answer pattern matrix (every word as a guess against every word as a
+        target) and writes it to path one row at a time
+
+        Parameters: self, path
+        returns: None
+        """
+
+        # writing to a temporary file first means another process never maps a half-written matrix
+        temp_path = f'{path}.{os.getpid()}.tmp'
+        file = open(temp_path, 'wb')
+        for row in self.get_rows(self.word_list):
+            file.write(row)
+        file.close()
+        os.replace(temp_path, path)
+
+    def get_matrix(self, directory='.'):
+        """Function loads the pattern matrix for this word list, building and saving it first if it is not on disk yet
+        Parameters: self, directory
+        returns: PatternMatrix
+        """
+
+        path = self.get_matrix_path(directory)
+        if not os.path.exists(path):
+            self.save_matrix(path)
+
+        return PatternMatrix(path, self.word_list, self.width)
+
+
+class PatternMatrix:
+
+    def __init__(self, path, word_list, width):
+        """Initializes the matrix by memory-mapping the file saved by PatternEngine.save_matrix - nothing is read until a
+        row is used
+
+        Parameters: self, path, word_list, width
+        returns: N/A
+        """
+
+        self.word_list = word_list
+        self.width = width
+        self.row_size = len(word_list) * width
+        # word_index maps each word to its row (as a guess) and its column (as a target)
+        self.word_index = {word: index for index, word in enumerate(word_list)}
+
+        file = open(path, 'rb')
+        self.buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        file.close()
+        if len(self.buffer) != self.row_size * len(word_list):
+            raise ValueError(f'{path} does not match the word list')
+
+        self.view = memoryview(self.buffer)
+        # on little-endian machines the lanes can be read straight from the mapped file
+        if width > 1 and sys.byteorder == 'little':
+            self.view = self.view.cast(lane_typecode(width))
+
+    def get_row(self, guess_index):
+        """Function gets the pattern codes of one guess against every target
+        Parameters: self, guess_index
+        returns: row
+        """
+
+        if self.width == 1 or sys.byteorder == 'little':
+            start = guess_index * len(self.word_list)
+            return self.view[start:start + len(self.word_list)]
+
+        # big-endian machines need the lanes swapped first
+        start = guess_index * self.row_size
+        row = array(lane_typecode(self.width), self.buffer[start:start + self.row_size])
+        row.byteswap()
+        return row
+
+    def get_column(self, target_index):
+        """Function gets the pattern codes of every guess against one target
+        Parameters: self, target_index
+        returns: column
+        """
+
+        if self.width == 1 or sys.byteorder == 'little':
+            # the codes of a target are one lane apart in every row, so the column is a strided view of the file
+            return self.view[target_index::len(self.word_list)]
+
+        return [self.get_row(guess_index)[target_index] for guess_index in range(len(self.word_list))]
+
+    def get_pattern(self, guess, target):
+        """Function gets the pattern code of guess against target
+        Parameters: self, guess, target
+        returns: pattern code
+        """
+
+        return self.get_row(self.word_index[guess])[self.word_index[target]]
+
+
+def main():
+
+    # building (or loading) the pattern matrix for the game's dictionary
+    dict1 = get_dictionary(5, 'scrabble5.txt')
+    engine = PatternEngine(dict1.word_list)
+    matrix = engine.get_matrix()
+    print(f'{len(matrix.word_list)} x {len(matrix.word_list)} patterns in {engine.get_matrix_path()}')
+    print(matrix.get_pattern('CRANE', 'TRACE'))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+# Author: Matthew Neufeld
+# Program Description: Opt-in instrumentation of the dictionary and feedback hot paths - call counts, latencies, memory
+# blocks left allocated by each call and (with memory tracing) the memory allocated during each call
+# Collaborators/References: https://docs.python.org/3/library/sys.html#sys.getallocatedblocks,
+# https://docs.python.org/3/library/tracemalloc.html, https://en.wikipedia.org/wiki/Reservoir_sampling
+
+
+import functools
+import inspect
+import json
+import random
+import sys
+import time
+import tracemalloc
+from Wordle175 import ScrabbleDict
+
+
+# the ScrabbleDict methods instrumented by enable_dictionary_profiling
+DICTIONARY_METHODS = ('__init__', 'check', 'get_masked_words', 'get_constrained_words', 'get_words', 'get_masked_bits',
+                      'get_constrained_bits', 'bits_to_words', 'iter_bits', 'iter_words', 'iter_masked_words',
+                      'iter_constrained_words', 'count_words', 'count_masked_words', 'count_constrained_words',
+                      'get_position_counts', 'get_suggestions')
+
+# how many latencies are kept for each function to work out its percentiles - once full, a random sample is kept
+SAMPLE_SIZE = 10000
+
+# function name: FunctionStats - only filled in while profiling is enabled
+profile_stats = {}
+
+# (owner, attribute name, original function) for everything instrumented, so disable() can put it back
+instrumented = []
+
+# the traced calls running right now, innermost last - each is [traced memory at the start of the call, highest peak --
+# seen before any of its inner calls reset the peak]
+memory_stack = []
+
+
+class FunctionStats:
+
+    __slots__ = ('calls', 'total', 'blocks', 'allocated', 'samples')
+
+    def __init__(self):
+        """Initializes the stats of one instrumented function
+        Parameters: self
+        returns: N/A
+        """
+
+        self.calls = 0
+        self.total = 0.0
+        self.blocks = 0
+        # None unless the function is profiled with memory tracing
+        self.allocated = None
+        self.samples = []
+
+    def add(self, elapsed, blocks, allocated=None):
+        """Function records one call
+        Parameters: self, elapsed (seconds), blocks (memory blocks still allocated after the call), allocated (peak
+        bytes allocated during the call, None without memory tracing)
+        returns: None
+        """
+
+        self.calls += 1
+        self.total += elapsed
+        self.blocks += blocks
+        if allocated is not None:
+            self.allocated = (self.allocated or 0) + allocated
+        # reservoir sampling keeps every call equally likely to be in the sample no matter how many calls there are
+        if len(self.samples) < SAMPLE_SIZE:
+            self.samples.append(elapsed)
+        else:
+            index = random.randrange(self.calls)
+            if index < SAMPLE_SIZE:
+                self.samples[index] = elapsed
+
+    def get_percentile(self, percentile):
+        """Function gets a latency percentile from the sample
+        Parameters: self, percentile
+        returns: seconds
+        """
+
+        samples = sorted(self.samples)
+        return samples[min(len(samples) - 1, len(samples) * percentile // 100)]
+
+    def to_dict(self):
+        """Function gets the stats as a dictionary - latencies are in milliseconds
+        Parameters: self
+        returns: stats
+        """
+
+        stats = {
+            'calls': self.calls,
+            'total_ms': round(self.total * 1000, 3),
+            'mean_ms': round(self.total / self.calls * 1000, 6),
+            'p50_ms': round(self.get_percentile(50) * 1000, 6),
+            'p90_ms': round(self.get_percentile(90) * 1000, 6),
+            'p99_ms': round(self.get_percentile(99) * 1000, 6),
+            # blocks the call left allocated (its result and anything it cached) - not every object it allocated
+            'retained_blocks_per_call': round(self.blocks / self.calls, 2),
+        }
+        if self.allocated is not None:
+            stats['allocated_kb_per_call'] = round(self.allocated / self.calls / 1024, 3)
+
+        return stats
+
+
+def wrap(function, name):
+    """Function wraps a function so every call is timed and the memory blocks it leaves allocated are counted. While
+    tracemalloc is tracing (see enable_memory_tracing), the peak memory allocated during each call is recorded too. A
+    generator function is timed over the whole iteration of each generator it returns
+
+    Parameters: function, name
+    returns: wrapper
+    """
+
+    stats = profile_stats.setdefault(name, FunctionStats())
+    perf_counter = time.perf_counter
+    allocated_blocks = sys.getallocatedblocks
+
+    if inspect.isgeneratorfunction(function):
+        # a generator does its work as it is iterated, so only the time spent producing items is added up - the time
+        # the caller spends between items is left out, and so is the memory allocated
+        @functools.wraps(function)
+        def generator_wrapper(*args, **kwargs):
+            blocks = allocated_blocks()
+            elapsed = 0.0
+            iterator = function(*args, **kwargs)
+            try:
+                while True:
+                    start = perf_counter()
+                    try:
+                        item = next(iterator)
+                    except StopIteration:
+                        return
+                    finally:
+                        elapsed += perf_counter() - start
+                    yield item
+            finally:
+                stats.add(elapsed, allocated_blocks() - blocks)
+
+        return generator_wrapper
+
+    if not tracemalloc.is_tracing():
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            blocks = allocated_blocks()
+            start = perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                stats.add(perf_counter() - start, allocated_blocks() - blocks)
+
+        return wrapper
+
+    get_traced_memory = tracemalloc.get_traced_memory
+    reset_peak = tracemalloc.reset_peak
+
+    @functools.wraps(function)
+    def traced_wrapper(*args, **kwargs):
+        current, peak = get_traced_memory()
+        # resetting the peak loses the peak of the call this one is inside, so it is kept on that call's entry
+        if memory_stack:
+            memory_stack[-1][1] = max(memory_stack[-1][1], peak)
+        reset_peak()
+        entry = [current, current]
+        memory_stack.append(entry)
+
+        blocks = allocated_blocks()
+        start = perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            elapsed = perf_counter() - start
+            memory_stack.pop()
+            peak = max(get_traced_memory()[1], entry[1])
+            if memory_stack:
+                memory_stack[-1][1] = max(memory_stack[-1][1], peak)
+            stats.add(elapsed, allocated_blocks() - blocks, peak - current)
+
+    return traced_wrapper
+
+
+def instrument(owner, attribute, name=None):
+    """Function replaces owner.attribute (a function in a module or a method of a class) with a wrapped version. Until
+    this is called the original function runs untouched, so disabled profiling costs nothing
+
+    Parameters: owner, attribute, name (shown in the report - defaults to owner.attribute)
+    returns: None
+    """
+
+    function = getattr(owner, attribute)
+    if name is None:
+        name = f'{getattr(owner, "__name__", owner)}.{attribute}'
+    instrumented.append((owner, attribute, function))
+    setattr(owner, attribute, wrap(function, name))
+
+
+def enable_memory_tracing():
+    """Function starts tracemalloc so functions instrumented after this also record the memory allocated during each
+    call - tracing slows every allocation down, so it is only started when asked for
+
+    Parameters: None
+    returns: None
+    """
+
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def enable_dictionary_profiling():
+    """Function instruments the ScrabbleDict hot paths - called before the dictionary is loaded so __init__ is counted
+    Parameters: None
+    returns: None
+    """
+
+    for method in DICTIONARY_METHODS:
+        instrument(ScrabbleDict, method, f'ScrabbleDict.{method}')
+
+
+def disable():
+    """Function puts back every original function and clears the stats
+    Parameters: None
+    returns: None
+    """
+
+    while instrumented:
+        owner, attribute, function = instrumented.pop()
+        setattr(owner, attribute, function)
+    profile_stats.clear()
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def get_report():
+    """Function gets the stats of every instrumented function that was called
+    Parameters: None
+    returns: report (a dictionary of function name: stats)
+    """
+
+    report = {}
+    for name in sorted(profile_stats):
+        if profile_stats[name].calls:
+            report[name] = profile_stats[name].to_dict()
+
+    return report
+
+
+def format_report(report):
+    """Function turns a report into a text table, slowest total time first
+    Parameters: report
+    returns: text
+    """
+
+    columns = ['calls', 'total_ms', 'mean_ms', 'p50_ms', 'p90_ms', 'p99_ms', 'retained_blocks_per_call']
+    if any(['allocated_kb_per_call' in stats for stats in report.values()]):
+        columns.append('allocated_kb_per_call')
+    # every column is wide enough for its name
+    widths = [max(14, len(column) + 2) for column in columns]
+
+    lines = ['function'.ljust(36) + ''.join([column.rjust(width) for column, width in zip(columns, widths)])]
+    for name in sorted(report, key=lambda name: -report[name]['total_ms']):
+        values = [str(report[name].get(column, '')) for column in columns]
+        lines.append(name.ljust(36) + ''.join([value.rjust(width) for value, width in zip(values, widths)]))
+
+    return '\n'.join(lines)
+
+
+def write_report(destination):
+    """Function writes the report - as JSON if destination ends in .json, as a text table otherwise. A destination of
+    '-' prints the text table
+
+    Parameters: destination
+    returns: None
+    """
+
+    report = get_report()
+    if destination == '-':
+        print(format_report(report))
+        return
+
+    file = open(destination, 'w')
+    if destination.endswith('.json'):
+        json.dump(report, file, indent=2)
+    else:
+        file.write(format_report(report) + '\n')
+    file.close()
@@ -0,0 +1,255 @@
+# Author: Matthew Neufeld
+# Program Description: Hosts many games of Wordle at once over a simple line protocol, all sharing one dictionary, and
+# includes a load generator to measure how many games the server can handle
+# Collaborators/References: https://docs.python.org/3/library/asyncio-stream.html
+
+# PROTOCOL (one command or response per line):
+#   server: READY <word size> <guess limit>      sent when a game starts
+#   client: GUESS <word>
+#   server: OK <feedback> <attempt>               feedback is one of G, O or R for each letter
+#           WIN <feedback> <attempt>
+#           LOSE <feedback> <target word>
+#           ERROR <reason>                        the guess was not counted
+#   client: NEW                                   starts a new game on the same connection
+#   client: QUIT
+
+
+import argparse
+import asyncio
+import os
+import random
+import time
+from Wordle175 import get_dictionary
+from candidates import format_feedback
+from gamelog import GameLog
+from main import validate_guess
+from patterns import get_pattern
+
+
+GUESS_LIMIT = 6
+
+# the game log is written at least this often (seconds), so a killed server only loses the last moment of games
+LOG_FLUSH_INTERVAL = 1.0
+
+
+class Session:
+
+    # __slots__ keeps every session down to four fields - a server holds thousands of them
+    __slots__ = ('target', 'guessed_words', 'codes', 'attempt_num')
+
+    def __init__(self, dict1):
+        """Initializes a game with a random target word
+        Parameters: self, dict1
+        returns: N/A
+        """
+
+        self.target = dict1.word_list[random.randrange(dict1.get_size())]
+        self.guessed_words = []
+        self.codes = []
+        self.attempt_num = 0
+
+    def play(self, dict1, guess, log=None):
+        """Function plays one guess - only the dictionary lookup and the cached pattern code are needed, so nothing
+        here can block the event loop
+
+        Parameters: self, dict1, guess, log (a GameLog the game is recorded in when it ends, or None)
+        returns: response line
+        """
+
+        # the game is over once the guess limit is reached or the last guess was the target word
+        if self.attempt_num >= GUESS_LIMIT or self.target in self.guessed_words:
+            return 'ERROR the game is over, send NEW to play again'
+
+        error = validate_guess(guess, dict1, self.guessed_words)
+        if error:
+            return f'ERROR {error}'
+
+        self.guessed_words.append(guess)
+        self.attempt_num += 1
+        self.codes.append(get_pattern(guess, self.target))
+        feedback = format_feedback(self.codes[-1], len(guess))
+
+        if log is not None and (guess == self.target or self.attempt_num == GUESS_LIMIT):
+            log.record_game(self.target, self.guessed_words, self.codes)
+
+        if guess == self.target:
+            return f'WIN {feedback} {self.attempt_num}'
+        if self.attempt_num == GUESS_LIMIT:
+            return f'LOSE {feedback} {self.target}'
+        return f'OK {feedback} {self.attempt_num}'
+
+
+async def handle_client(dict1, reader, writer, log=None):
+    """Function runs the games of one connection until the client sends QUIT or disconnects
+    Parameters: dict1, reader, writer, log (a GameLog every finished game is recorded in, or None)
+    returns: None
+    """
+
+    session = Session(dict1)
+    writer.write(f'READY {dict1.get_word_size()} {GUESS_LIMIT}\n'.encode())
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            command, _, argument = line.decode('ascii', 'replace').strip().partition(' ')
+            command = command.upper()
+
+            if command == 'GUESS':
+                response = session.play(dict1, argument.strip().upper(), log)
+            elif command == 'NEW':
+                session = Session(dict1)
+                response = f'READY {dict1.get_word_size()} {GUESS_LIMIT}'
+            elif command == 'QUIT':
+                break
+            else:
+                response = f'ERROR unknown command {command}'
+
+            writer.write(response.encode() + b'\n')
+            await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(dict1, host='127.0.0.1', port=8175, unix_path=None, log=None):
+    """Function starts the server on a TCP port, or a Unix socket if unix_path is given, and runs it forever
+    Parameters: dict1, host, port, unix_path, log (a GameLog every finished game is recorded in, or None)
+    returns: None
+    """
+
+    async def handle(reader, writer):
+        await handle_client(dict1, reader, writer, log)
+
+    if unix_path:
+        server = await asyncio.start_unix_server(handle, unix_path, backlog=4096)
+    else:
+        server = await asyncio.start_server(handle, host, port, backlog=4096)
+    print(f'Serving {dict1.get_size()} words on {unix_path or f"{host}:{port}"}')
+
+    # the event loop only keeps a weak reference to a task, so the flusher is held here until the server stops
+    flusher = None
+    if log is not None:
+        flusher = asyncio.create_task(flush_log(log))
+
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        if flusher is not None:
+            flusher.cancel()
+            # the games finished since the last flush are written before the server goes away
+            log.flush()
+
+
+async def flush_log(log):
+    """Function writes the waiting records of the game log every LOG_FLUSH_INTERVAL seconds
+    Parameters: log
+    returns: None
+    """
+
+    while True:
+        await asyncio.sleep(LOG_FLUSH_INTERVAL)
+        log.flush()
+
+
+async def play_client(word_list, host, port, unix_path, latencies, rng):
+    """Function connects to the server and plays one game with random guesses, recording the time of every turn
+    Parameters: word_list, host, port, unix_path, latencies, rng
+    returns: None
+    """
+
+    if unix_path:
+        reader, writer = await asyncio.open_unix_connection(unix_path)
+    else:
+        reader, writer = await asyncio.open_connection(host, port)
+    await reader.readline()
+
+    game_over = False
+    while not game_over:
+        guess = word_list[rng.randrange(len(word_list))]
+        start = time.perf_counter()
+        writer.write(f'GUESS {guess}\n'.encode())
+        response = await reader.readline()
+        latencies.append(time.perf_counter() - start)
+        game_over = not response or response.startswith((b'WIN', b'LOSE'))
+
+    writer.write(b'QUIT\n')
+    writer.close()
+    await writer.wait_closed()
+
+
+async def run_load(dict1, sessions, concurrency, host='127.0.0.1', port=8175, unix_path=None, seed=None):
+    """Function plays sessions games against the server, with up to concurrency games connected at once
+    Parameters: dict1, sessions, concurrency, host, port, unix_path, seed
+    returns: latencies (seconds, one for each turn), elapsed (seconds)
+    """
+
+    word_list = list(dict1.word_list)
+    rng = random.Random(seed)
+    latencies = []
+    limit = asyncio.Semaphore(concurrency)
+
+    async def play_limited():
+        async with limit:
+            await play_client(word_list, host, port, unix_path, latencies, rng)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[play_limited() for session in range(sessions)])
+
+    return latencies, time.perf_counter() - start
+
+
+def display_load_report(sessions, latencies, elapsed):
+    """Function displays the sessions per second and the turn latencies of a load run
+    Parameters: sessions, latencies, elapsed
+    returns: None
+    """
+
+    latencies = sorted(latencies)
+    print(f'{sessions} sessions ({len(latencies)} turns) in {elapsed:.2f}s')
+    print(f'{sessions / elapsed:.1f} sessions/sec, {len(latencies) / elapsed:.1f} turns/sec')
+    for percentile in (50, 90, 99):
+        index = min(len(latencies) - 1, len(latencies) * percentile // 100)
+        print(f'p{percentile} turn latency: {latencies[index] * 1000:.3f} ms')
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description='Wordle game server and load generator')
+    parser.add_argument('mode', choices=('serve', 'load'), help='run the server or the load generator')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8175)
+    parser.add_argument('--unix', help='path of a Unix socket to use instead of TCP')
+    parser.add_argument('--sessions', type=int, default=1000, help='games to play (load)')
+    parser.add_argument('--concurrency', type=int, default=200, help='games connected at once (load)')
+    parser.add_argument('--log', metavar='FILE', help='record every finished game in the game log FILE (serve)')
+    parser.add_argument('--seed', type=int, help='random seed for the guesses (load)')
+    args = parser.parse_args()
+
+    # establishing the dictionary - every session shares this one read-only object
+    dict1 = get_dictionary(5, 'scrabble5.txt')
+
+    if args.mode == 'serve':
+        if args.unix and os.path.exists(args.unix):
+            os.remove(args.unix)
+        # the log is only written from the event loop's thread, in batches, and whatever is left is written on exit
+        # the server's feedback follows the standard rule (patterns.get_pattern) - the log's header records it, so the --
+        # game's own logs (main.py --log) are never mixed into the same file
+        log = GameLog(args.log, 'standard') if args.log else None
+        try:
+            asyncio.run(serve(dict1, args.host, args.port, args.unix, log))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if log is not None:
+                log.close()
+    else:
+        latencies, elapsed = asyncio.run(run_load(dict1, args.sessions, args.concurrency, args.host, args.port,
+                                                  args.unix, args.seed))
+        display_load_report(args.sessions, latencies, elapsed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+# Author: Matthew Neufeld
+# Program Description: Plays many games of Wordle without any input or printing to measure guess strategies and the
+# speed of the feedback engine
+# Collaborators/References: https://docs.python.org/3/library/multiprocessing.html
+
+
+import os
+import random
+import time
+from Wordle175 import SharedDictionary, shared_worker
+from patterns import PatternEngine, PatternMatrix
+from solver import get_bucket_sizes, score_buckets
+
+
+# the same limit as the interactive game in main.py
+GUESS_LIMIT = 6
+
+# how many games each worker process plays before sending its results back
+CHUNK_SIZE = 200
+
+# the first guess used by entropy_strategy - scoring every word against the full dictionary on every game is wasted --
+# work because the answer never changes
+ENTROPY_OPENER = 'TARES'
+
+# the pattern matrix and strategy used by play_chunk - set once in each worker by init_worker
+worker_state = {}
+
+
+def random_strategy(matrix, candidates, history, rng):
+    """Strategy guesses a random word out of the words that could still be the target word
+    Parameters: matrix, candidates, history, rng
+    returns: guess index
+    """
+
+    return rng.choice(candidates)
+
+
+def first_strategy(matrix, candidates, history, rng):
+    """Strategy always guesses the first word (alphabetically) that could still be the target word
+    Parameters: matrix, candidates, history, rng
+    returns: guess index
+    """
+
+    return candidates[0]
+
+
+def entropy_strategy(matrix, candidates, history, rng):
+    """Strategy guesses the word that could still be the target word with the highest expected information gain
+    Parameters: matrix, candidates, history, rng
+    returns: guess index
+    """
+
+    if not history and ENTROPY_OPENER in matrix.word_index:
+        return matrix.word_index[ENTROPY_OPENER]
+
+    best = None
+    for guess_index in candidates:
+        score = score_buckets(get_bucket_sizes(matrix.get_row(guess_index), candidates), len(candidates), 'entropy')
+        if best is None or score < best[0]:
+            best = (score, guess_index)
+
+    return best[1]
+
+
+# strategies are looked up by name so they can be chosen from the command line and sent to worker processes
+STRATEGIES = {
+    'random': random_strategy,
+    'first': first_strategy,
+    'entropy': entropy_strategy,
+}
+
+
+def play_game(matrix, target_index, strategy, rng):
+    """Function plays one game against target_index. After every guess only the candidates that would have given the
+    same pattern code are kept
+
+    Parameters: matrix, target_index, strategy, rng
+    returns: the number of guesses needed, or 0 if the game was lost
+    """
+
+    win_code = 3 ** len(matrix.word_list[0]) - 1
+    candidates = list(range(len(matrix.word_list)))
+    history = []
+
+    for attempt_num in range(1, GUESS_LIMIT + 1):
+        guess_index = strategy(matrix, candidates, history, rng)
+        row = matrix.get_row(guess_index)
+        code = row[target_index]
+        if code == win_code:
+            return attempt_num
+        history.append((guess_index, code))
+        candidates = [index for index in candidates if row[index] == code and index != guess_index]
+
+    return 0
+
+
+def init_worker(path, word_list, width, strategy_name):
+    """Function sets up a worker process - every worker memory-maps the same pattern matrix file
+    Parameters: path, word_list (None uses the words of the dictionary attached by SharedDictionary.get_pool), width,
+    strategy_name
+    returns: None
+    """
+
+    if word_list is None:
+        word_list = shared_worker['dict1'].word_list
+    worker_state['matrix'] = PatternMatrix(path, word_list, width)
+    worker_state['strategy'] = STRATEGIES[strategy_name]
+
+
+def play_chunk(chunk):
+    """Function plays a chunk of games
+    Parameters: chunk (a (seed, target indexes) tuple)
+    returns: results (the number of guesses needed for each game, 0 for a loss)
+    """
+
+    seed, target_indexes = chunk
+    rng = random.Random(seed)
+    results = []
+    for target_index in target_indexes:
+        results.append(play_game(worker_state['matrix'], target_index, worker_state['strategy'], rng))
+
+    return results
+
+
+def simulate(dict1, games, strategy_name='entropy', processes=None, seed=None, directory='.'):
+    """Function plays games against random target words from dict1 across a pool of worker processes
+    Parameters: dict1, games, strategy_name, processes (defaults to the number of cores), seed, directory
+    returns: results (the number of guesses needed for each game, 0 for a loss), elapsed (seconds)
+    """
+
+    engine = PatternEngine(dict1.word_list)
+    matrix = engine.get_matrix(directory)
+    path = engine.get_matrix_path(directory)
+
+    rng = random.Random(seed)
+    targets = [rng.randrange(len(matrix.word_list)) for game in range(games)]
+    chunks = []
+    for start in range(0, games, CHUNK_SIZE):
+        chunks.append((rng.random(), targets[start:start + CHUNK_SIZE]))
+
+    processes = processes or os.cpu_count() or 1
+    start_time = time.perf_counter()
+    results = []
+    if processes == 1 or len(chunks) == 1:
+        init_worker(path, matrix.word_list, matrix.width, strategy_name)
+        for chunk in chunks:
+            results.extend(play_chunk(chunk))
+    else:
+        # the workers attach to one shared copy of the words instead of each being sent the whole list
+        init_args = (path, None, matrix.width, strategy_name)
+        with SharedDictionary(dict1) as shared, shared.get_pool(processes, init_worker, init_args) as pool:
+            for chunk_results in pool.imap(play_chunk, chunks):
+                results.extend(chunk_results)
+    elapsed = time.perf_counter() - start_time
+
+    return results, elapsed
+
+
+def display_report(results, elapsed):
+    """Function displays the games per second, win rate and the distribution of guesses needed
+    Parameters: results, elapsed
+    returns: None
+    """
+
+    wins = [result for result in results if result]
+    print(f'{len(results)} games in {elapsed:.2f}s ({len(results) / elapsed:.1f} games/sec)')
+    print(f'Win rate: {round(len(wins) / len(results) * 100, 2)}%')
+    if wins:
+        print(f'Average guesses (wins): {round(sum(wins) / len(wins), 3)}')
+
+    for attempt_num in range(1, GUESS_LIMIT + 1):
+        count = results.count(attempt_num)
+        print(f'{attempt_num}: {str(count).rjust(6)} {round(count / len(results) * 100, 2)}%')
+    print(f'X: {str(results.count(0)).rjust(6)} {round(results.count(0) / len(results) * 100, 2)}%')
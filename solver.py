@@ -0,0 +1,250 @@
+# Author: Matthew Neufeld
+# Program Description: Ranks guesses by how well they split up the words that could still be the target word
+# Collaborators/References: https://en.wikipedia.org/wiki/Entropy_(information_theory),
+# https://docs.python.org/3/library/multiprocessing.html
+
+
+import heapq
+import math
+import os
+import sys
+from array import array
+from collections import Counter
+from operator import itemgetter
+from Wordle175 import SharedDictionary, shared_worker
+from patterns import PatternEngine, PatternMatrix
+
+
+# how many guesses each worker process scores before sending its results back
+CHUNK_SIZE = 256
+
+# the ways a guess can be scored - 'entropy' is the expected information gain in bits (higher is better), --
+# 'worst_case' is the size of the biggest group of candidates left over (lower is better)
+METRICS = ('entropy', 'worst_case')
+
+# the pattern matrix, candidates and metric used by score_chunk - set once in each worker by init_worker
+worker_state = {}
+
+
+def get_bucket_sizes(row, candidates):
+    """Function counts how many candidates end up with each pattern code when a guess is played
+    Parameters: row (the guess' row of the pattern matrix), candidates (word indexes, or None for every word)
+    returns: bucket_sizes
+    """
+
+    if candidates is None:
+        # a row of one-byte codes is counted as raw bytes, which Counter goes through faster than a memoryview
+        if isinstance(row, memoryview) and row.itemsize == 1:
+            row = row.tobytes()
+        return list(Counter(row).values())
+    # itemgetter pulls every candidate's code out of the row in one call instead of a Python loop
+    if len(candidates) == 1:
+        return [1]
+    return list(Counter(itemgetter(*candidates)(row)).values())
+
+
+def score_buckets(bucket_sizes, total, metric):
+    """Function turns the bucket sizes of a guess into its score - a smaller score is always a better guess
+    Parameters: bucket_sizes, total, metric
+    returns: score
+    """
+
+    if metric == 'worst_case':
+        return max(bucket_sizes)
+
+    # entropy = log2(total) - sum(size * log2(size)) / total, negated so that smaller is better
+    weighted = 0.0
+    for size in bucket_sizes:
+        weighted += size * math.log2(size)
+    return weighted / total - math.log2(total)
+
+
+def init_worker(path, word_list, width, candidates, metric):
+    """Function sets up a worker process - every worker memory-maps the same pattern matrix file
+    Parameters: path, word_list (None uses the words of the dictionary attached by SharedDictionary.get_pool), width,
+    candidates, metric
+    returns: None
+    """
+
+    if word_list is None:
+        word_list = shared_worker['dict1'].word_list
+    worker_state['matrix'] = PatternMatrix(path, word_list, width)
+    worker_state['candidates'] = candidates
+    worker_state['metric'] = metric
+
+
+def score_chunk(guess_indexes):
+    """Function scores a chunk of guesses against the candidates in worker_state
+    Parameters: guess_indexes
+    returns: a list of (score, guess index) tuples
+    """
+
+    matrix = worker_state['matrix']
+    candidates = worker_state['candidates']
+    metric = worker_state['metric']
+    if candidates is None:
+        total = len(matrix.word_list)
+    else:
+        total = len(candidates)
+
+    scores = []
+    for guess_index in guess_indexes:
+        bucket_sizes = get_bucket_sizes(matrix.get_row(guess_index), candidates)
+        scores.append((score_buckets(bucket_sizes, total, metric), guess_index))
+
+    return scores
+
+
+class Solver:
+
+    def __init__(self, dict1, directory='.', processes=None):
+        """Initializes the solver for a dictionary, building the dictionary's pattern matrix if it is not saved yet
+        Parameters: self, dict1, directory, processes (defaults to the number of cores)
+        returns: N/A
+        """
+
+        self.dict1 = dict1
+        self.word_list = dict1.word_list
+        self.engine = PatternEngine(self.word_list)
+        self.matrix = self.engine.get_matrix(directory)
+        self.path = self.engine.get_matrix_path(directory)
+        self.directory = directory
+        self.processes = processes or os.cpu_count() or 1
+        # full_scores[metric] is the score of every guess against every word - see get_full_scores
+        self.full_scores = {}
+
+    def get_indexes(self, words):
+        """Function gets the index of every word in words
+        Parameters: self, words
+        returns: indexes
+        """
+
+        return [self.matrix.word_index[word] for word in words]
+
+    def suggest(self, candidates=None, top_k=10, metric='entropy', guesses=None):
+        """Function ranks guesses by how well they split up the candidates. Guesses are scored in chunks across a pool
+        of worker processes and the best top_k found so far is yielded every time a chunk finishes, so the caller can
+        show results before every guess has been scored.
+
+        Parameters: self, candidates (words that could be the target, None for every word), top_k, metric, guesses
+        (words allowed as guesses, None for every word)
+        returns: a generator of lists of (word, score) tuples, best first - the last list has the final ranking
+        """
+
+        if metric not in METRICS:
+            raise ValueError(f'metric must be one of {METRICS}')
+
+        if candidates is None:
+            candidate_indexes = None
+            candidate_set = set(range(len(self.word_list)))
+        else:
+            candidate_indexes = self.get_indexes(candidates)
+            candidate_set = set(candidate_indexes)
+            # there is nothing left to split once one candidate remains
+            if len(candidate_indexes) <= 1:
+                yield [(word, 0) for word in candidates]
+                return
+
+        if guesses is None:
+            guess_indexes = list(range(len(self.word_list)))
+        else:
+            guess_indexes = self.get_indexes(guesses)
+
+        # the ranking against every word never changes, so it is read from the saved scores instead of scored again
+        if len(candidate_set) == len(self.word_list):
+            scores = self.get_full_scores(metric)
+            best = heapq.nsmallest(top_k, [(scores[index], index) for index in guess_indexes])
+            yield [(self.word_list[index], self.present_score(score, metric)) for score, index in best]
+            return
+
+        chunks = [guess_indexes[start:start + CHUNK_SIZE] for start in range(0, len(guess_indexes), CHUNK_SIZE)]
+
+        init_args = (self.path, self.word_list, self.matrix.width, candidate_indexes, metric)
+        best = []
+        for scores in self.score_chunks(chunks, init_args):
+            # ties are broken in favour of guesses that could be the target word themselves
+            ranked = [(score, index not in candidate_set, index) for score, index in scores]
+            best = heapq.nsmallest(top_k, best + ranked)
+            yield [(self.word_list[index], self.present_score(score, metric)) for score, _, index in best]
+
+    def get_scores_path(self, metric):
+        """Function gets the file name of the saved scores of every guess against every word for a metric - named like
+        the pattern matrix, so a changed word list never loads old scores
+
+        Parameters: self, metric
+        returns: path
+        """
+
+        return os.path.join(self.directory, f'scores-{metric}-{self.engine.size}-{self.engine.digest[:16]}.bin')
+
+    def get_full_scores(self, metric):
+        """Function gets the score of every guess against every word, scoring them and saving the scores next to the
+        pattern matrix the first time
+
+        Parameters: self, metric
+        returns: scores (an array of doubles, one for each word as a guess)
+        """
+
+        if metric in self.full_scores:
+            return self.full_scores[metric]
+
+        path = self.get_scores_path(metric)
+        scores = array('d')
+        if os.path.exists(path):
+            file = open(path, 'rb')
+            scores.frombytes(file.read())
+            file.close()
+            # the file stores the scores little-endian
+            if sys.byteorder != 'little':
+                scores.byteswap()
+
+        if len(scores) != len(self.word_list):
+            indexes = list(range(len(self.word_list)))
+            chunks = [indexes[start:start + CHUNK_SIZE] for start in range(0, len(indexes), CHUNK_SIZE)]
+            scores = array('d', [0.0] * len(self.word_list))
+            for chunk_scores in self.score_chunks(chunks, (self.path, self.word_list, self.matrix.width, None, metric)):
+                for score, index in chunk_scores:
+                    scores[index] = score
+
+            saved = array('d', scores)
+            if sys.byteorder != 'little':
+                saved.byteswap()
+            # writing to a temporary file first means another process never reads half-written scores
+            temp_path = f'{path}.{os.getpid()}.tmp'
+            file = open(temp_path, 'wb')
+            file.write(saved.tobytes())
+            file.close()
+            os.replace(temp_path, path)
+
+        self.full_scores[metric] = scores
+        return scores
+
+    def score_chunks(self, chunks, init_args):
+        """Function scores every chunk of guesses, using a process pool when there is more than one core
+        Parameters: self, chunks, init_args
+        returns: a generator of lists of (score, guess index) tuples, in the order the chunks finish
+        """
+
+        if self.processes == 1 or len(chunks) == 1:
+            init_worker(*init_args)
+            for chunk in chunks:
+                yield score_chunk(chunk)
+            return
+
+        # the workers attach to one shared copy of the words instead of each being sent the whole list
+        path, word_list, width, candidates, metric = init_args
+        shared_args = (path, None, width, candidates, metric)
+        with SharedDictionary(self.dict1) as shared, shared.get_pool(self.processes, init_worker, shared_args) as pool:
+            for scores in pool.imap_unordered(score_chunk, chunks):
+                yield scores
+
+    def present_score(self, score, metric):
+        """Function turns an internal score back into the number shown to the user
+        Parameters: self, score, metric
+        returns: score
+        """
+
+        if metric == 'entropy':
+            return round(-score, 3)
+        # saved scores are read back as floats
+        return int(score)